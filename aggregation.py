@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# Branch summaries (the مجمع sheets) put every product on one row with a column per branch.
+# Chaining pd.merge(how="outer") over the branch frames copies the growing result once per
+# branch, which is quadratic in the branch count. Here all branches are stacked into one
+# long frame, each key combination is numbered once and the values are laid out with a
+# single groupby + unstack. Rows come out sorted by the keys and missing branch values are
+# NaN, the same as the chained outer merge (tests/test_aggregation.py holds the two to
+# identical output).
+
+
+def pivot_branches(frames: dict, keys: list, values: dict, how: dict = None) -> pd.DataFrame:
+    """
+    One row per distinct key combination across `frames`, in key order (in row order for
+    a single branch).
+    Args:
+        frames: {branch: DataFrame with the `keys` and `values` columns}, in column order
+        keys: columns identifying a product; missing keys are matched like any other value
+        values: {source column: output column name with a "{branch}" placeholder}, e.g.
+            {"qty": "{branch}", "price": "price_{branch}"}; each branch gets its columns in
+            this order
+        how: {source column: "sum", "max", "first", ...}, how a key repeated within one
+            branch combines that column's values; unlisted columns are summed, so pass
+            "max" or "first" for prices, e.g. {"qty": "sum", "price": "max"}
+    """
+    how = {value: (how or {}).get(value, "sum") for value in values}
+    value_columns = list(values)
+    branches = list(frames)
+    if not branches:
+        return pd.DataFrame(columns=keys)
+
+    long = pd.concat(
+        [df[keys + value_columns].assign(_branch=position) for position, df in enumerate(frames.values())],
+        ignore_index=True
+    )
+    # a single branch keeps its own row order, as there is nothing to merge it with
+    row = long.groupby(keys, sort=len(branches) > 1, dropna=False).ngroup().to_numpy()
+    _, first = np.unique(row, return_index=True)
+    result = long[keys].iloc[first].reset_index(drop=True)
+
+    grouped = long[value_columns].groupby([row, long["_branch"].to_numpy()])
+    wide = pd.concat(
+        # min_count keeps an all-missing sum missing, as the outer merge leaves it
+        [grouped[value].sum(min_count=1) if how[value] == "sum" else grouped[value].agg(how[value])
+         for value in value_columns],
+        axis=1
+    ).unstack()
+    wide = wide.reindex(
+        index=range(len(result)),
+        columns=pd.MultiIndex.from_product([value_columns, range(len(branches))])
+    )
+
+    columns = {}
+    for position, branch in enumerate(branches):
+        for value, name in values.items():
+            columns[name.format(branch=branch)] = wide[(value, position)].to_numpy()
+    return pd.concat([result, pd.DataFrame(columns, index=result.index)], axis=1)
+
@@ -0,0 +1,38 @@
+import os
+import threading
+from io import BytesIO
+
+# Static files bundled with the app (the invoice logo), read from disk once per process.
+# Relative names resolve against this directory rather than the working directory, so
+# the Streamlit portal and the scheduled job find the same files wherever they start.
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO = "Picture1.png"
+
+_assets = {}
+_lock = threading.Lock()
+
+
+def asset_path(name: str) -> str:
+    return name if os.path.isabs(name) else os.path.join(ASSET_DIR, name)
+
+
+def asset_bytes(name: str) -> bytes:
+    """Contents of an asset; raises FileNotFoundError naming the path if it is missing."""
+    path = asset_path(name)
+    data = _assets.get(path)
+    if data is None:
+        with _lock:
+            data = _assets.get(path)
+            if data is None:
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    raise FileNotFoundError(f"Invoice asset missing: {path}") from None
+                _assets[path] = data
+    return data
+
+
+def image_options(name: str = LOGO, **options) -> dict:
+    """insert_image options that embed the cached bytes instead of reading the file."""
+    return {"image_data": BytesIO(asset_bytes(name)), **options}
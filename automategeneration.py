@@ -15,11 +15,16 @@ from halanInvoices import build_master_and_invoices_bytes
 from rabbitInvoices import rabbitInvoices
 from pdfsToExcels import process_talabat_invoices
 from breadfastInvoices import process_breadfast_invoice
+from zipBundle import repack
+from catalogueSync import sync_catalogue
+from branchRegistry import report_branch_misses, reset_branch_misses
+from invoiceRegistry import link_artifact
+from stateStore import pull_stores, push_stores
+import config
 from config import (
-    translation_dict,
-    categories_dict,
     branches_dict,
     branches_translation_tlbt,
+    branches_translation_rabbit,
     columns
 )
 
@@ -36,18 +41,8 @@ SUPABASE_HEADERS = {
     "authorization": AUTHORIZATION
 }
 
-# === Google Sheets Connection (gspread, using service account JSON from env var) ===
-# Make sure you set GSHEET_SERVICE_ACCOUNT_JSON to the full JSON of your service account
-service_account_info = json.loads(os.environ["GSHEET_SERVICE_ACCOUNT_JSON"])
-gc = gspread.service_account_from_dict(service_account_info)
-
 # Replace with your actual spreadsheet name
 SPREADSHEET_NAME = "Khodar Pricing Control"
-worksheet = gc.open(SPREADSHEET_NAME).worksheet("Saved")
-
-# read invoice number from A2
-a2 = worksheet.acell("A2").value
-invoice_number = int(str(a2).strip())
 
 # Mapping from local selected_key (lowercase) to the exact client name stored in DB/UI.
 # IMPORTANT: Khateer must be "Khateer" (capital K) in DB & UI according to your note.
@@ -170,6 +165,8 @@ def upload_order_and_metadata(
     except Exception as e:
         print("Storage upload exception:", str(e))
         raise
+    if order_type == "Invoice":
+        link_artifact(file_bytes, filename, f"{STORAGE_BUCKET}/{object_name}")
 
     # public URL (adjust if your storage setup is private)
     file_url = f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/{object_name}"
@@ -304,30 +301,16 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                         data,
                         invoice_number,
                         order.get("delivery_date"),
-                        branches_translation={
-                            "ميفيدا": "Mevida",
-                            "فرع المعادي": "MAADI",
-                            "فرع الدقي": "MOHANDSEEN",
-                            "فرع الرحاب": "Rehab",
-                            "فرع التجمع": "TGAMOE",
-                            "فرع مصر الجديدة": "MASR GEDIDA",
-                            "فرع مدينة نصر": "Nasr City",
-                            "اكتوبر٢": "OCTOBER",
-                            "فرع دريم": "Dream",
-                            "فرع زايد": "ZAYED",
-                            "فرع سوديك": "Sodic",
-                            "مدينتي": "Madinaty"
-                        }
+                        branches_translation=branches_translation_rabbit
                     )
                     invoice_number += idx + 1
                     z = ZipFile(BytesIO(zip_bytes))
                     inner = None; excels = []
                     for n in z.namelist():
-                        c = z.read(n)
                         if n.lower().endswith('.zip'):
-                            inner = c
+                            inner = z.read(n)
                         elif n.lower().endswith('.xlsx'):
-                            excels.append((n, c))
+                            excels.append(n)
 
                     # When uploading for Khateer, DO NOT send city or po_number (they don't exist for Khateer).
                     if inner:
@@ -340,13 +323,9 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                                                   city=None)
 
                     if excels:
-                        newz = BytesIO()
-                        with ZipFile(newz, 'w') as z2:
-                            for n, c in excels:
-                                z2.writestr(n, c)
                         # mark done using exact DB client name
                         mark_purchase_order_done(db_client_name, order.get("delivery_date"))
-                        upload_order_and_metadata(newz.getvalue(), f"{sk_lower}_JobOrder_{order['delivery_date']}.zip",
+                        upload_order_and_metadata(repack(z, excels), f"{sk_lower}_JobOrder_{order['delivery_date']}.zip",
                                                   client=db_client_name,
                                                   order_type="Job Order",
                                                   order_date=order.get('order_date'),
@@ -360,30 +339,16 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                         data,
                         invoice_number,
                         order.get("delivery_date"),
-                        branches_translation={
-                            "ميفيدا": "Mevida",
-                            "فرع المعادي": "MAADI",
-                            "فرع الدقي": "MOHANDSEEN",
-                            "فرع الرحاب": "Rehab",
-                            "فرع التجمع": "TGAMOE",
-                            "فرع مصر الجديدة": "MASR GEDIDA",
-                            "فرع مدينة نصر": "Nasr City",
-                            "اكتوبر٢": "OCTOBER",
-                            "فرع دريم": "Dream",
-                            "فرع زايد": "ZAYED",
-                            "فرع سوديك": "Sodic",
-                            "مدينتي": "Madinaty"
-                        }
+                        branches_translation=branches_translation_rabbit
                     )
                     invoice_number += idx + 1
                     z = ZipFile(BytesIO(zip_bytes))
                     inner = None; excels = []
                     for n in z.namelist():
-                        c = z.read(n)
                         if n.lower().endswith('.zip'):
-                            inner = c
+                            inner = z.read(n)
                         elif n.lower().endswith('.xlsx'):
-                            excels.append((n, c))
+                            excels.append(n)
                     if inner:
                         upload_order_and_metadata(inner, f"{sk_lower}_Invoice_{order['delivery_date']}.zip",
                                                   client=db_client_name,
@@ -393,12 +358,8 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                                                   po_number=order.get('po_number'),
                                                   city=order.get('city'))
                     if excels:
-                        newz = BytesIO()
-                        with ZipFile(newz, 'w') as z2:
-                            for n, c in excels:
-                                z2.writestr(n, c)
                         mark_purchase_order_done(db_client_name, order.get("delivery_date"), order.get("city"))
-                        upload_order_and_metadata(newz.getvalue(), f"{sk_lower}_JobOrder_{order['delivery_date']}.zip",
+                        upload_order_and_metadata(repack(z, excels), f"{sk_lower}_JobOrder_{order['delivery_date']}.zip",
                                                   client=db_client_name,
                                                   order_type="Job Order",
                                                   order_date=order.get('order_date'),
@@ -413,8 +374,8 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                         zip_file_bytes=data,
                         invoice_date=d_date,
                         base_invoice_number=invoice_number,
-                        translation_dict=translation_dict,
-                        categories_dict=categories_dict,
+                        translation_dict=config.translation_dict,
+                        categories_dict=config.categories_dict,
                         branches_dict=branches_dict,
                         branches_translation_tlbt=branches_translation_tlbt,
                         columns=columns
@@ -423,11 +384,10 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                     z = ZipFile(BytesIO(zip_bytes))
                     inner = None; excels = []
                     for n in z.namelist():
-                        c = z.read(n)
                         if n.lower().endswith('.zip'):
-                            inner = c
+                            inner = z.read(n)
                         elif n.lower().endswith('.xlsx'):
-                            excels.append((n, c))
+                            excels.append(n)
                     if inner:
                         upload_order_and_metadata(inner, f"Talabat_Invoice_{d_date}.zip",
                                                   client=db_client_name,
@@ -437,12 +397,8 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                                                   po_number=order.get('po_number'),
                                                   city=order.get('city'))
                     if excels:
-                        newz = BytesIO()
-                        with ZipFile(newz, 'w') as z2:
-                            for n, c in excels:
-                                z2.writestr(n, c)
                         mark_purchase_order_done(db_client_name, d_date, order.get("city"))
-                        upload_order_and_metadata(newz.getvalue(), f"Talabat_JobOrder_{d_date}.zip",
+                        upload_order_and_metadata(repack(z, excels), f"Talabat_JobOrder_{d_date}.zip",
                                                   client=db_client_name,
                                                   order_type="Job Order",
                                                   order_date=order['order_date'],
@@ -464,17 +420,12 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                     z = ZipFile(BytesIO(zip_bytes))
                     jobf = []; invf = []
                     for n in z.namelist():
-                        c = z.read(n)
                         if 'مجمع' in n:
-                            jobf.append((n, c))
+                            jobf.append(n)
                         else:
-                            invf.append((n, c))
+                            invf.append(n)
                     if jobf:
-                        jz = BytesIO()
-                        with ZipFile(jz, 'w') as z2:
-                            for n, c in jobf:
-                                z2.writestr(n, c)
-                        upload_order_and_metadata(jz.getvalue(), f"Breadfast_JobOrder_{city}_{d_date}.zip",
+                        upload_order_and_metadata(repack(z, jobf), f"Breadfast_JobOrder_{city}_{d_date}.zip",
                                                   client=db_client_name,
                                                   order_type="Job Order",
                                                   order_date=order['order_date'],
@@ -482,11 +433,7 @@ def process_client(selected_key: str, invoice_number: int) -> int:
                                                   po_number=order.get('po_number'),
                                                   city=city)
                     if invf:
-                        iz = BytesIO()
-                        with ZipFile(iz, 'w') as z2:
-                            for n, c in invf:
-                                z2.writestr(n, c)
-                        upload_order_and_metadata(iz.getvalue(), f"Breadfast_Invoices_{city}_{d_date}.zip",
+                        upload_order_and_metadata(repack(z, invf), f"Breadfast_Invoices_{city}_{d_date}.zip",
                                                   client=db_client_name,
                                                   order_type="Invoice",
                                                   order_date=order['order_date'],
@@ -502,11 +449,32 @@ def process_client(selected_key: str, invoice_number: int) -> int:
 
 
 if __name__ == "__main__":
+    # === Google Sheets Connection (gspread, using service account JSON from env var) ===
+    # Make sure you set GSHEET_SERVICE_ACCOUNT_JSON to the full JSON of your service account.
+    # Connected here rather than at import: render workers import this script again.
+    service_account_info = json.loads(os.environ["GSHEET_SERVICE_ACCOUNT_JSON"])
+    gc = gspread.service_account_from_dict(service_account_info)
+    worksheet = gc.open(SPREADSHEET_NAME).worksheet("Saved")
+
+    # read invoice number from A2
+    a2 = worksheet.acell("A2").value
+    invoice_number = int(str(a2).strip())
+
+    sync_catalogue()
+    reset_branch_misses()
+    # the runner starts from a fresh checkout; history lives in shared storage between runs
+    pull_stores()
     clients = ["khateer", "goodsmart", "halan", "rabbit", "breadfast", "talabat"]
-    for client in clients:
-        print(f"=== Processing {client} ===")
-        invoice_number = process_client(client, invoice_number)
-        time.sleep(5)  # wait 5 seconds before next client
+    try:
+        for client in clients:
+            print(f"=== Processing {client} ===")
+            invoice_number = process_client(client, invoice_number)
+            time.sleep(5)  # wait 5 seconds before next client
+    finally:
+        push_stores()
+    unknown_branches = report_branch_misses()
+    if unknown_branches:
+        print("Branch names missing from the branch tables:\n" + unknown_branches)
     # persist invoice number back to Google Sheet
     try:
         worksheet.update("A2", [[invoice_number]])
@@ -0,0 +1,102 @@
+import re
+import threading
+from collections import Counter
+
+from config import branches_translation_tlbt, branches_translation_rabbit
+
+# One lookup table per client for branch names as they appear in uploads (sheet names,
+# workbook cells, PDF labels). Keys are normalized once when a table is registered (ة/ه,
+# ى/ي, hamza forms of alef, waw and yeh, Arabic-Indic digits, diacritics, tatweel, spacing
+# and case), so every lookup is a single dict access on the normalized name. A name that
+# is not in its client's table is counted and reported rather than passed on unnoticed;
+# the caller still gets the name back (or its default) so a run is not stopped by a new
+# branch. Misses are counted per run: reset_branch_misses() starts a run, and the counts
+# belong to the calling thread, so portal sessions running side by side (one thread each)
+# only ever report their own.
+_FOLD = str.maketrans({
+    "ة": "ه", "ى": "ي",
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي",
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # ٠-٩
+    **{chr(0x06F0 + d): str(d) for d in range(10)},  # ۰-۹
+})
+_MARKS = re.compile("[\u064b-\u0652\u0670\u0640]")  # harakat, dagger alef, tatweel
+_SPACES = re.compile(r"\s+")
+
+_registries = {}  # client -> {normalized name: value}
+_sources = {}  # client -> the mapping the table was built from
+_run = threading.local()  # .misses: Counter of (client, name) -> lookups that found nothing
+
+
+def _misses() -> Counter:
+    misses = getattr(_run, "misses", None)
+    if misses is None:
+        misses = _run.misses = Counter()
+    return misses
+
+
+def reset_branch_misses() -> None:
+    """Forgets the misses counted so far in this thread; call it when a run starts."""
+    _run.misses = Counter()
+
+
+def normalize_branch(name) -> str:
+    """The lookup key of a branch name: folded Arabic letters and digits, single spaces."""
+    text = _MARKS.sub("", str(name).translate(_FOLD))
+    return _SPACES.sub(" ", text).strip().casefold()
+
+
+def build_registry(mapping: dict, client: str = "") -> dict:
+    """{normalized name: value} for `mapping`; names that fold together must agree."""
+    registry = {}
+    for name, value in mapping.items():
+        key = normalize_branch(name)
+        if key in registry and registry[key] != value:
+            print(f"{client} branches {name!r} and another name both normalize to {key!r}; keeping {registry[key]!r}")
+            continue
+        registry[key] = value
+    return registry
+
+
+def register_branches(client: str, mapping: dict) -> None:
+    """Makes `mapping` (upload name → value) the branch table of `client`."""
+    _registries[client] = build_registry(mapping, client)
+    _sources[client] = mapping
+
+
+def resolve_branch(client: str, name, mapping: dict = None, default=None):
+    """
+    The value for branch `name` in `client`'s table, or in `mapping` when a caller passes
+    a table other than the registered one. A miss is counted and returns `default`, or
+    the stripped name when there is no default.
+    """
+    if mapping is None or mapping is _sources.get(client):
+        registry = _registries[client]
+    else:
+        registry = build_registry(mapping, client)
+    value = registry.get(normalize_branch(name))
+    if value is not None:
+        return value
+    misses = _misses()
+    if not misses[(client, str(name))]:
+        print(f"Unknown {client} branch {name!r}")
+    misses[(client, str(name))] += 1
+    return str(name).strip() if default is None else default
+
+
+def branch_misses(client: str = None) -> dict:
+    """{(client, name): lookups} for names no table knew in this run, most frequent first."""
+    return {key: count for key, count in _misses().most_common() if client is None or key[0] == client}
+
+
+def report_branch_misses() -> str:
+    """One line per unknown branch name seen in this run (empty when there were none)."""
+    return "\n".join(f"{client}: {name!r} × {count}" for (client, name), count in branch_misses().items())
+
+
+register_branches("talabat", branches_translation_tlbt)
+register_branches("rabbit", branches_translation_rabbit)
+# Halan sheets are named after the branch; the canonical spellings, in invoice order, are
+# the sheet titles
+HALAN_BRANCHES = ["مدينه نصر", "اكتوبر", "المقطم", "حدائق الاهرام", "جسر السويس"]
+register_branches("halan", {name: name for name in HALAN_BRANCHES})
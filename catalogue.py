@@ -0,0 +1,161 @@
+import os
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Product catalogue lookups shared by the client converters. The catalogue itself is
+# catalogue.json (barcode → product, category → products, Talabat SKU → product, Breadfast
+# ID → product), read on first use. The indexes built from it are cached against the
+# file's modification time and size, so editing or syncing the file is picked up by a
+# running worker on its next lookup without a restart. Whole columns are resolved with
+# Series.map or Index.get_indexer instead of a Python callback per row. Every client keeps
+# its own label for products that are not in the catalogue, so the fallback is passed in
+# by the caller.
+CATALOGUE_PATH = os.environ.get(
+    "KHODAR_CATALOGUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogue.json")
+)
+CATALOGUE_VERSION = 1
+
+# invoice order of the categories (their Categorical codes); a client's fallback label
+# sorts after them
+CATEGORY_ORDER = ["فاكهه", "خضار", "جاهز", "اعشاب"]
+
+_loaded = None  # (path, mtime_ns, size, catalogue)
+_lock = threading.Lock()
+
+
+def _invert(categories: dict) -> dict:
+    return {product.strip(): category for category, products in categories.items() for product in products}
+
+
+def _sku_lookup(translation: dict) -> tuple:
+    # position -1 of the names (an unknown SKU) is NaN
+    return pd.Index(list(translation.keys())), np.array(list(translation.values()) + [np.nan], dtype=object)
+
+
+def build_catalogue(data: dict) -> dict:
+    """The catalogue dicts of a parsed catalogue.json plus every index built from them."""
+    if data.get("version") != CATALOGUE_VERSION:
+        raise ValueError(f"Unsupported catalogue version {data.get('version')!r}, expected {CATALOGUE_VERSION}")
+    barcode_to_product = data["barcode_to_product"]
+    categories_dict = data["categories_dict"]
+    # JSON object keys are text; Talabat SKUs are numbers
+    translation_dict = {int(sku): product for sku, product in data["translation_dict"].items()}
+    product_to_category = _invert(categories_dict)
+    sku_index, sku_names = _sku_lookup(translation_dict)
+    return {
+        "barcode_to_product": barcode_to_product,
+        "categories_dict": categories_dict,
+        "translation_dict": translation_dict,
+        "ids_to_products": data["ids_to_products"],
+        "product_to_category": product_to_category,
+        "barcode_to_category": {
+            barcode: product_to_category[product.strip()]
+            for barcode, product in barcode_to_product.items()
+            if product.strip() in product_to_category
+        },
+        "sku_index": sku_index,
+        "sku_names": sku_names,
+    }
+
+
+def catalogue(path: str = None) -> dict:
+    """
+    The current catalogue (see build_catalogue), reloaded when the file has changed since
+    the last call. A file that fails to load keeps the previous catalogue in use.
+    """
+    global _loaded
+    path = path or CATALOGUE_PATH
+    stat = os.stat(path)
+    loaded = _loaded
+    if loaded is not None and loaded[:3] == (path, stat.st_mtime_ns, stat.st_size):
+        return loaded[3]
+
+    with _lock:
+        if _loaded is not None and _loaded[:3] == (path, stat.st_mtime_ns, stat.st_size):
+            return _loaded[3]
+        try:
+            with open(path, encoding="utf-8") as f:
+                built = build_catalogue(json.load(f))
+        except (ValueError, KeyError) as e:
+            if _loaded is None or _loaded[0] != path:
+                raise
+            print(f"Catalogue {path} could not be loaded ({e}); keeping the previous one")
+            return _loaded[3]
+        _loaded = (path, stat.st_mtime_ns, stat.st_size, built)
+        return built
+
+
+def reload() -> dict:
+    """Forgets the cached catalogue and reads the file again."""
+    global _loaded
+    with _lock:
+        _loaded = None
+    return catalogue()
+
+
+def save_catalogue(data: dict, path: str = None) -> None:
+    """Writes catalogue.json atomically, so a running worker never reads half a file."""
+    path = path or CATALOGUE_PATH
+    build_catalogue(data)  # refuse to write something that would not load
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def category_index(categories: dict = None) -> dict:
+    """product → category for `categories`; the prebuilt index for the current catalogue."""
+    current = catalogue()
+    if categories is None or categories is current["categories_dict"]:
+        return current["product_to_category"]
+    return _invert(categories)
+
+
+def products_by_sku(skus, translation: dict = None) -> np.ndarray:
+    """Product name per SKU (NaN where unknown), from `translation` or the current catalogue."""
+    current = catalogue()
+    if translation is None or translation is current["translation_dict"]:
+        index, names = current["sku_index"], current["sku_names"]
+    else:
+        index, names = _sku_lookup(translation)
+    return names[index.get_indexer(skus)]
+
+
+def products_by_id(ids: pd.Series, default=None) -> pd.Series:
+    """Breadfast product name per ID; `default` (NaN when None) where unknown."""
+    products = ids.astype(str).map(catalogue()["ids_to_products"])
+    return products if default is None else products.fillna(default)
+
+
+def _keys(values: pd.Series) -> pd.Series:
+    # the same text str(value).strip() gives for a single cell
+    return values.astype(str).str.strip()
+
+
+def categories_for(names: pd.Series, barcodes: pd.Series = None, default=None) -> pd.Series:
+    """
+    Category of every row: through its barcode's catalogue product first, then through
+    its product name; `default` (NaN when None) where neither is known.
+    """
+    current = catalogue()
+    category = _keys(names).map(current["product_to_category"])
+    if barcodes is not None:
+        category = _keys(barcodes).map(current["barcode_to_category"]).fillna(category)
+    return category if default is None else category.fillna(default)
+
+
+def sort_by_category(df: pd.DataFrame, category_column: str, name_column: str, fallback: str = None) -> pd.DataFrame:
+    """
+    `df` sorted by category in CATEGORY_ORDER, then `fallback`, then anything else, and by
+    product name within a category; categories are compared by their Categorical codes.
+    """
+    order = CATEGORY_ORDER + ([fallback] if fallback is not None else [])
+    codes = pd.Categorical(df[category_column], categories=order).codes.astype("int64")
+    codes[codes < 0] = len(order)
+    return df.assign(_category_order=codes).sort_values(["_category_order", name_column]).drop(columns="_category_order")
+
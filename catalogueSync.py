@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+
+import requests
+
+from config import SUPABASE_URL, API_KEY, AUTHORIZATION
+from catalogue import CATALOGUE_PATH, catalogue, save_catalogue
+
+# Keeps catalogue.json (the local snapshot every converter reads from memory) in step with
+# the Supabase catalogue table, so a new SKU or barcode is named and categorized without a
+# code change. Syncing is never done on a converter's path: the worker and the portal call
+# sync_catalogue() before a run, and it only goes to the network once the snapshot is older
+# than KHODAR_CATALOGUE_TTL seconds. Each sync asks only for rows updated at or after the
+# newest one already applied (a row committed late with that same timestamp would be lost
+# to a strict "after") and drops the ones at that timestamp it has applied before. It sends
+# the ETag of the last answer and rewrites the snapshot only when something changed. Rows come in pages of KHODAR_CATALOGUE_PAGE_SIZE (PostgREST caps
+# every answer at its max-rows setting), and a sync whose rows do not add up to the
+# server's count is refused rather than applied. A failed sync leaves the snapshot as it is.
+#
+# The sync state (catalogue.json.sync) describes the local snapshot and stays next to it;
+# it is deliberately not kept in shared storage like the SQLite stores, as it would then
+# claim rows the committed catalogue.json of a fresh checkout never received. A fresh
+# checkout (the hourly GitHub Actions runner, a restarted portal) therefore starts with a
+# full, paged fetch of the table and is incremental from then on.
+#
+# Table rows: kind ("barcode", "sku" or "breadfast_id"), code, product, category (optional),
+# deleted (bool) and updated_at (timestamp).
+CATALOGUE_TABLE = os.environ.get("KHODAR_CATALOGUE_TABLE", "catalogue")
+CATALOGUE_TTL = int(os.environ.get("KHODAR_CATALOGUE_TTL", 15 * 60))
+CATALOGUE_PAGE_SIZE = int(os.environ.get("KHODAR_CATALOGUE_PAGE_SIZE", 1000))
+SYNC_STATE_PATH = f"{CATALOGUE_PATH}.sync"
+
+# catalogue.json section each row kind updates
+KIND_SECTIONS = {
+    "barcode": "barcode_to_product",
+    "sku": "translation_dict",
+    "breadfast_id": "ids_to_products",
+}
+
+
+def _load_state() -> dict:
+    try:
+        with open(SYNC_STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state: dict) -> None:
+    tmp_path = f"{SYNC_STATE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, SYNC_STATE_PATH)
+
+
+def _content_total(content_range: str):
+    # "0-999/2345" or "*/0"; None when the server did not count
+    total = (content_range or "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def fetch_changed_rows(since: str = None, etag: str = None) -> tuple:
+    """
+    (rows, etag) of catalogue rows updated at or after `since`, oldest first; rows is None
+    when the server answers 304 for `etag`. Raises ValueError when the pages received do not
+    add up to the total in the server's Content-Range.
+    """
+    headers = {"apikey": API_KEY, "authorization": AUTHORIZATION, "prefer": "count=exact", "range-unit": "items"}
+    # rows sharing a timestamp need a fixed order too, or pages could skip or repeat them
+    params = {"select": "kind,code,product,category,deleted,updated_at", "order": "updated_at.asc,kind.asc,code.asc"}
+    if since:
+        params["updated_at"] = f"gte.{since}"
+
+    rows, total, first_etag = [], None, None
+    while True:
+        page_headers = {**headers, "range": f"{len(rows)}-{len(rows) + CATALOGUE_PAGE_SIZE - 1}"}
+        if etag and not rows:
+            page_headers["if-none-match"] = etag
+        resp = requests.get(f"{SUPABASE_URL}/rest/v1/{CATALOGUE_TABLE}", headers=page_headers, params=params, timeout=30)
+        if resp.status_code == 304:
+            return None, etag
+        resp.raise_for_status()
+        page = resp.json()
+        if not rows:
+            first_etag = resp.headers.get("etag")
+        page_total = _content_total(resp.headers.get("content-range"))
+        if rows and page_total != total:
+            # rows moved between pages, so offsets no longer line up
+            raise ValueError(f"the catalogue table changed while paging ({total} rows, then {page_total})")
+        total = page_total
+        rows.extend(page)
+        # a short page is not the end: the server may cap pages below CATALOGUE_PAGE_SIZE
+        if not page or total is None or len(rows) >= total:
+            break
+
+    if total is None or len(rows) != total:
+        raise ValueError(f"received {len(rows)} catalogue rows, the server counted {total}")
+    # an unchanged first page only means an unchanged answer when it held every row
+    return rows, first_etag if total < CATALOGUE_PAGE_SIZE else None
+
+
+def _row_key(row: dict) -> list:
+    return [row.get("kind"), str(row.get("code", "")).strip()]
+
+
+def _unapplied_rows(rows: list, state: dict) -> list:
+    """`rows` without those at the state's updated_at mark that were applied already."""
+    applied = state.get("applied", [])
+    return [row for row in rows if row["updated_at"] != state.get("updated_at") or _row_key(row) not in applied]
+
+
+def _advance_state(state: dict, rows: list) -> None:
+    """Moves the updated_at mark to the newest of the newly applied `rows`."""
+    mark = rows[-1]["updated_at"]
+    at_mark = [_row_key(row) for row in rows if row["updated_at"] == mark]
+    if mark == state.get("updated_at"):
+        at_mark = state.get("applied", []) + at_mark
+    state["updated_at"] = mark
+    state["applied"] = at_mark
+
+
+def apply_rows(data: dict, rows: list) -> int:
+    """Applies table rows to a catalogue.json document in place; returns how many changed it."""
+    changed = 0
+    for row in rows:
+        section = KIND_SECTIONS.get(row.get("kind"))
+        code = str(row.get("code", "")).strip()
+        if section is None or not code or (section == "translation_dict" and not code.isdigit()):
+            print(f"Skipping catalogue row {row}")
+            continue
+        entries = data[section]
+        product = (row.get("product") or "").strip()
+
+        if row.get("deleted"):
+            changed += entries.pop(code, None) is not None
+            continue
+        if product and entries.get(code) != product:
+            entries[code] = product
+            changed += 1
+
+        category = (row.get("category") or "").strip()
+        if product and category and product not in data["categories_dict"].get(category, []):
+            # a product belongs to one category
+            for products in data["categories_dict"].values():
+                if product in products:
+                    products.remove(product)
+            data["categories_dict"].setdefault(category, []).append(product)
+            changed += 1
+    return changed
+
+
+def sync_catalogue(force: bool = False) -> bool:
+    """
+    Brings the snapshot up to date if it is older than the TTL (or `force`);
+    True when the snapshot was rewritten.
+    """
+    state = _load_state()
+    if not force and time.time() - state.get("checked_at", 0) < CATALOGUE_TTL:
+        return False
+
+    try:
+        rows, etag = fetch_changed_rows(state.get("updated_at"), state.get("etag"))
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Catalogue sync failed ({e}); using the local snapshot")
+        return False
+
+    state["checked_at"] = time.time()
+    state["etag"] = etag
+    changed = 0
+    rows = _unapplied_rows(rows or [], state)
+    if rows:
+        with open(CATALOGUE_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+        changed = apply_rows(data, rows)
+        if changed:
+            save_catalogue(data, CATALOGUE_PATH)
+        _advance_state(state, rows)
+        print(f"Catalogue sync: {len(rows)} updated rows, {changed} changes")
+    _save_state(state)
+    if changed:
+        catalogue(CATALOGUE_PATH)  # rebuild the indexes now rather than on the first lookup
+    return bool(changed)
+
+
+if __name__ == "__main__":
+    # Usage: python catalogueSync.py [--force]
+    sync_catalogue(force="--force" in sys.argv[1:])
@@ -1,444 +1,3 @@
-barcode_to_product = {
-            "2283957660118": "ملوخية جاهزة500جم",
-            "2283957710019": "فاصوليا مقطعة فريش 350 جرام",
-            "2283957660106": "كابوتشا مقطع 350 جم",
-            "2283957660097": "ميكس كرنب سلطة مقطع فريش 350 جرام",
-            "2283957660093": "بطاطس شيبسى فريش 350 جرام",
-            "2283957660091": "بطاطس صوابع فريش 350 جرام",
-            "2283957660101": "فلفل مقور محشي 350 جم",
-            "2283957660105": "بطاطس شرائح 350 جم",
-            "2283957660104": "جزر مقطع 350 جم",
-            "2283957660103": "كوسة حلقات 350جم",
-            "2283957980016": "فلفل حلو 250 جرام",
-            "2283957660070": "رمان 1كجم",
-            "2283958160045": "ابوفروة 250جم",
-            "2283957660068": "يوسفي كلمنتينا 1كجم",
-            "2283958160042": "يوسفي بلدي 1كجم",
-            "2283958160092": "بلح برحي 500 جم",
-            "2283958160132": "خوخ مستورد 500 جم",
-            "2283958160095": "نكتارين مستورد 500 جم",
-            "2283957880019": "فلفل اخضر كوبي 250جم",
-            "2283958160018": "ثوم صيني ابيض 200جم",
-            "2283958160038": "فول سوداني 500جم",
-            "2283957680015": "رمان مفرط 350 جم",
-            "2283957750015": "بامية جاهزة 350 جم",
-            "2283958130014": "ملوخية جاهزة350جم",
-            "2283958160072": "كريز 250 جم",
-            "2283958160084": "مانجو فونس 1 ك",
-            "2283958160083": "مانجو فص عويس 500 جم",
-            "2283958160073": "مانجو عويس 1 ك",
-            "2283958160066": "مانجو صديقة 1ك",
-            "2283958160063": "مانجو زبدية 1ك",
-            "2283958160054": "برقوق احمر محلي 1ك",
-            "2283958160082": "عنب بناتى 1ك",
-            "2283958160051": "عنب ايرلي سويت ابيض 1ك",
-            "2283958160050": "عنب فليم احمر 1ك",
-            "2283958160070": "قصب مقشر350جم",
-            "2283958090011": "قلقاس مكعبات فريش 350 جرام",
-            "2283958070013": "محشى مشكل فريش 350 جرام",
-            "2283958050015": "كوسة مقورة فريش 350 جرام",
-            "2283957740022": "كمثرى افريقي500 جرام",
-            "2283957910013": "فلفل الوان معبأ 500 جرام",
-            "2283957690014": "تفاح اصفر ايطالى 1ك معبأ",
-            "2283957740020": "برتقال عصير 2ك معبأ",
-            "2283958160057": "جوز هند قطعة",
-            "2283958160043": "يوسفي موركت 1ك",
-            "2283958160031": "جوافة 1ك معبأ",
-            "2283957600013": "بطاطا 1ك",
-            "2283957550011": "برتقال بسرة 1ك",
-            "2283957580018": "بطاطس معبأ 1ك",
-            "2283957540012": "بصل احمر معبأ 1ك",
-            "2283958040016": "بصل ابيض معبأ 1ك",
-            "2283957990015": "باذنجان كوبى معبأ 1ك",
-            "2283958160055": "عنب كريمسون لبنانى 500 جرام معبأ",
-            "2283958160060": "قرع مكعبات صافى 350 جرام",
-            "2283957770013": "عبوة ثوم مفصص 100 جرام",
-            "2283957830014": "خضار مشكل فريش 350 جرام",
-            "2283957800017": "سوتيه فريش 350 جرام",
-            "2283957650018": "بسلة مفصصة بالجزر فريش 350 جرام",
-            "2283957590017": "بسلة مفصصة فريش 350 جرام",
-            "2283957740016": "عنب اسود مستورد 500 جرام معبأ",
-            "2283957920012": "موز مستورد 1ك",
-            "2283957870010": "كيوي فاخر 250 جرام معبأ",
-            "2283957660017": "تفاح اخضر امريكى 1ك معبأ",
-            "2283957720018": "تفاح سكرى جالا 1ك معبأ",
-            "2283957640019": "تفاح احمر مستورد 1ك معبأ",
-            "2283957570019": "برقوق احمر مستورد 1ك",
-            "2283958160046": "اناناس سكري فاخر معبأ",
-            "2283957470012": "افوكادو 500 جرام",
-            "2283958160039": "عنب ابيض مستورد 500 جرام",
-            "2283958160037": "موز بلدي فاخر 1ك معبأ",
-            "2283957840013": "كنتالوب 2ك معبأ",
-            "2283958160028": "كزبرة معبأ",
-            "2283958160027": "كرفس فرنساوي 250 جرام",
-            "2283958160026": "شبت معبأ",
-            "2283958160024": "زعتر فريش معبأ",
-            "2283958160023": "ريحان اخضر معبأ",
-            "2283958160022": "روزمارى فريش معبأ",
-            "2283958160021": "جرجير معبأ",
-            "2283958160020": "بقدونس معبأ",
-            "2283957530013": "مشروم 200 جرام معبأ",
-            "2283958140013": "كرنب احمر سلطة معبأ",
-            "2283958120015": "كرنب ابيض سلطة معبأ",
-            "2283958100017": "كابوتشى معبأ",
-            "2283957780012": "زنجبيل 100 جرام معبأ",
-            "2283957730017": "ذرة سكري 2 قطعه",
-            "2283958160019": "خس بلدي فاخر معبأ",
-            "2283958160017": "بصل اخضر معبأ",
-            "2283957520014": "ليمون بلدى فاخر معبأ 250 جرام",
-            "2283958160011": "ليمون اضاليا 250 جرام",
-            "2283958150012": "كوسة معبأ 500 جرام",
-            "2283958160016": "كرات 250 جرام",
-            "2283958060014": "قرنبيط 500 جرام",
-            "2283957950019": "فلفل اخضر حار معبأ 250 جرام",
-            "2283958160014": "فجل احمر 500 جرام",
-            "2283958160013": "طماطم فاخر معبأ 1ك",
-            "2283957850012": "طماطم شيرى معبأ 250 جرام",
-            "2283958160012": "خيار فاخر معبأ 1ك",
-            "2283957670016": "جزر معبأ 500 جرام",
-            "2283957610012": "بنجر احمر معبأ 500 جرام",
-            "2283958020018": "بروكلي 500 جرام",
-            "2283957940010": "باذنجان عروس اسود معبأ 1 كيلو",
-            "2283958160074": "عنب اسود 1ك",
-            "2283957960018": "باذنجان عروس ابيض معبأ 1 كيلو",
-            "2283958160015": "فلفل حار احمر 250 جرام",
-            "2283958160040": "فراوله 250 جرام",
-            "2283958160056": "كمثري لبناني 500 جرام",
-            "2283958160062": "حرنكش مقشر 250 جرام",
-            "2283957740023": "برقوق اصفر مستورد 1ك",
-            "2283958160071": "بلح عراقي 1ك",
-            "2283957910070": "بطيخ",
-            "2283957910071": "بطيخ احمر بدون بذر",
-            "2283957910072": "بطيخ اصفر بدون بذر",
-            "2283957910073": "خوخ سكرى",
-            "2283957660071": "بسلة 500 جم",
-            "2283957660072": "فاصوليا خضراء 500جم",
-            "2283958160030": "جريب فروت ابيض 1كجم",
-            "2283958160099": "جريب فروت احمر 1كجم",
-            "2283957660107": "خوخ محلي 1كجم",
-            "2283957660067": "يوسفي كريستينا 1كجم",
-            "2283957900014": "شمام شهد 1ك معبأ",
-            "": "باذنجان للحشو 350جم",
-            "2283958160068": "تفاح مشكل 1كجم",
-            "2283957560010": "خوخ سكري 1 كجم",
-            "2283958160040" : "مانجو كيت 1.5 كجم",
-            "2283957660099": "خضار.كوم فلفل ألوان اصفر 500 جرام",
-            "2283957660145": "خضار.كوم فلفل ألوان احمر 500 جرام",
-            "2283957660185": "خضار.كوم بنجر 1 كيلو معبأ",
-            "2283957660192": "خضار.كوم ليمون جراس 200 جرام",
-            "2283957660193": "خضار.كوم ليمون اخضر 500 جرام",
-            "2283957660184": "خضار.كوم ليمون اضاليا 500 جرام",
-            "2283957660114" : "خضار.كوم جوز هند مقطع 350 جرام",
-            "2283957660131" : "خضار.كوم فجل ابيض 500 جرام",
-            "2283957660119" : "خضار.كوم كرنب بلدي قطعه",
-            "2283957660194" : "خضار.كوم قشطة عبدالرازق 500 جرام"           
-            
-        }
-
-
-
-
-categories_dict = {
-            "اعشاب": [
-    "بصل اخضر معبأ",
-    "بقدونس معبأ",
-    "جرجير معبأ",
-    "خس بلدي فاخر معبأ",
-    "روزمارى فريش معبأ",
-    "ريحان اخضر معبأ",
-    "زعتر فريش معبأ",
-    "شبت معبأ",
-    "كابوتشى معبأ",
-    "كرفس فرنساوي 250 جرام",
-    "كرنب ابيض سلطة معبأ",
-    "كرنب احمر سلطة معبأ",
-    "كزبرة معبأ",
-    "ملوخية جاهزة500جم",
-    "كرات 250 جرام",
-    "اسباراجوس 250 جرام",
-    "نعناع 100 جرام",
-    "نعناع 50 جرام",
-    "بصل اخضر معبأ 200جم" ,
-    "خضار.كوم ليمون جراس 200 جرام"
-],
-"جاهز": [
-    "باذنجان للحشو 350جم",
-    "بسلة مفصصة بالجزر فريش 350 جرام",
-    "بسلة مفصصة فريش 350 جرام",
-    "بطاطس شرائح 350 جم",
-    "بطاطس شيبسى فريش 350 جرام",
-    "بطاطس صوابع فريش 350 جرام",
-    "جزر مقطع 350 جم",
-    "خضار مشكل فريش 350 جرام",
-    "رمان مفرط 350 جم",
-    "سوتيه فريش 350 جرام",
-    "عبوة ثوم مفصص 100 جرام",
-    "فاصوليا مقطعة فريش 350 جرام",
-    "فلفل مقور محشي 350 جم",
-    "قرع مكعبات صافى 350 جرام",
-    "قرنبيط 500 جرام",
-    "قصب مقشر350جم",
-    "قلقاس مكعبات فريش 350 جرام",
-    "كابوتشا مقطع 350 جم",
-    "كوسة حلقات 350جم",
-    "كوسة مقورة فريش 350 جرام",
-    "محشى مشكل فريش 350 جرام",
-    "ملوخية جاهزة350جم",
-    "ميكس كرنب سلطة مقطع فريش 350 جرام",
-    "بامية جاهزة 350 جم",
-    "خضار سوتيه شوي 350 جرام",
-    "بطاطس ودجز 350 جرام",
-    "بطاطا حلوة حلقات 350 جرام",
-    "خضار.كوم جوز هند مقطع 350 جرام"
-],
-"خضار": [
-    "باذنجان عروس اسود معبأ 1 كيلو",
-    "باذنجان كوبى معبأ 1ك",
-    "بصل ابيض معبأ 1ك",
-    "بصل احمر معبأ 1ك",
-    "بطاطا 1ك",
-    "بطاطس معبأ 1ك",
-    "بنجر احمر معبأ 500 جرام",
-    "ثوم صيني ابيض 200جم",
-    "جزر معبأ 500 جرام",
-    "خيار فاخر معبأ 1ك",
-    "طماطم فاخر معبأ 1ك",
-    "فجل احمر 500 جرام",
-    "فلفل اخضر حار معبأ 250 جرام",
-    "فلفل اخضر كوبي 250جم",
-    "فلفل الوان معبأ 500 جرام",
-    "فلفل حلو 250 جرام",
-    "كوسة معبأ 500 جرام",
-    "ليمون اضاليا 250 جرام",
-    "ليمون بلدى فاخر معبأ 250 جرام",
-    "باذنجان عروس ابيض معبأ 1 كيلو",
-    "بسلة 500 جم",
-    "فاصوليا خضراء 500جم",
-    "فلفل حار احمر 250 جرام",
-    "ليمون اضاليا 500 جرام",
-    "فلفل اخضر كوبي 500جم" , 
-    "خضار.كوم فلفل ألوان اصفر 500 جرام",
-    "خضار.كوم فلفل ألوان احمر 500 جرام",
-    "خضار.كوم بنجر 1 كيلو معبأ",
-    "خضار.كوم ليمون اخضر 500 جرام",
-    "خضار.كوم ليمون اضاليا 500 جرام",
-    "خضار.كوم كرنب بلدي قطعه",
-    "خضار.كوم فجل ابيض 500 جرام"
-],
-"فاكهه": [
-    "ابوفروة 250جم",
-    "افوكادو 500 جرام",
-    "اناناس سكري فاخر معبأ",
-    "برتقال عصير 2ك معبأ",
-    "بروكلي 500 جرام",
-    "بطيخ",
-    "بطيخ احمر بدون بذر",
-    "بطيخ اصفر بدون بذر",
-    "تفاح احمر مستورد 1ك معبأ",
-    "تفاح اخضر امريكى 1ك معبأ",
-    "تفاح اصفر ايطالى 1ك معبأ",
-    "تفاح سكرى جالا 1ك معبأ",
-    "تفاح مشكل 1كجم",
-    "جوز هند قطعة",
-    "خوخ سكرى",
-    "خوخ محلي 1كجم",
-    "ذرة سكري 2 قطعه",
-    "زنجبيل 100 جرام معبأ",
-    "طماطم شيرى معبأ 250 جرام",
-    "عنب اسود 1ك",
-    "عنب اسود مستورد 500 جرام معبأ",
-    "عنب ايرلي سويت ابيض 1ك",
-    "فول سوداني 500جم",
-    "كنتالوب 2ك معبأ",
-    "كيوي فاخر 250 جرام معبأ",
-    "مشروم 200 جرام معبأ",
-    "موز بلدي فاخر 1ك معبأ",
-    "موز مستورد 1ك",
-    "يوسفي بلدي 1كجم",
-    "يوسفي موركت 1ك",
-    "برتقال بسرة 1ك",
-    "برقوق احمر محلي 1ك",
-    "برقوق احمر مستورد 1ك",
-    "برقوق اصفر مستورد 1ك",
-    "بلح برحي 500 جم",
-    "بلح عراقي 1ك",
-    "جريب فروت ابيض 1كجم",
-    "جريب فروت احمر 1كجم",
-    "جوافة 1ك معبأ",
-    "حرنكش مقشر 250 جرام",
-    "خوخ مستورد 500 جم",
-    "رمان 1كجم",
-    "شمام شهد 1ك معبأ",
-    "عنب ابيض مستورد 500 جرام",
-    "عنب بناتى 1ك",
-    "عنب فليم احمر 1ك",
-    "عنب كريمسون لبنانى 500 جرام معبأ",
-    "فراوله 250 جرام",
-    "كريز 250 جم",
-    "كمثرى افريقي500 جرام",
-    "كمثري لبناني 500 جرام",
-    "مانجو زبدية 1ك",
-    "مانجو صديقة 1ك",
-    "مانجو عويس 1 ك",
-    "مانجو فص عويس 500 جم",
-    "مانجو فونس 1 ك",
-    "نكتارين مستورد 500 جم",
-    "يوسفي كريستينا 1كجم",
-    "يوسفي كلمنتينا 1كجم",
-    "مانجو تيمور 1 ك",
-    "مانجو سكري 1 ك",
-    "مانجو نعومي 1 ك",
-    "مانجو كيت 1.5 كجم" ,  
-    "تفاح مشكل 1كجم",
-    "خضار.كوم قشطة عبدالرازق 500 جرام" 
-]
-}
-
-
-
-translation_dict = {926242: 'ملوخية جاهزة500جم',
-        924881: 'فاصوليا مقطعة فريش 350 جرام',
-        924880: 'كابوتشا مقطع 350 جم',
-        924879: 'ميكس كرنب سلطة مقطع فريش 350 جرام',
-        924878: 'بطاطس شيبسى فريش 350 جرام',
-        924877: 'بطاطس صوابع فريش 350 جرام',
-        924876: 'فلفل مقور محشي 350 جم',
-        924875: 'بطاطس شرائح 350 جم',
-        924874: 'جزر مقطع 350 جم',
-        924873: 'كوسة حلقات 350جم',
-        924871: 'فلفل حلو 250 جرام',
-        924868: 'رمان 1كجم',
-        924867: 'ابوفروة 250جم',
-        924864: 'يوسفي كلمنتينا 1كجم',
-        924862: 'يوسفي بلدي 1كجم',
-        924861: 'بلح برحي 500 جم',
-        924860: 'خوخ مستورد 500 جم',
-        924859: 'نكتارين مستورد 500 جم',
-        924858: 'فلفل اخضر كوبي 250جم',
-        924857: 'ثوم صيني ابيض 200جم',
-        924856: 'فول سوداني 500جم',
-        913437: 'رمان مفرط 350 جم',
-        912855: 'بامية جاهزة 350 جم',
-        912854: 'ملوخية جاهزة350جم',
-        912852: 'كريز 250 جم',
-        912850: 'مانجو فونس 1 ك',
-        912849: 'مانجو فص عويس 500 جم',
-        912848: 'مانجو عويس 1 ك',
-        912847: 'مانجو صديقة 1ك',
-        912846: 'مانجو زبدية 1ك',
-        912845: 'برقوق احمر محلي 1ك',
-        912844: 'عنب بناتى 1ك',
-        912843: 'عنب ايرلي سويت ابيض 1ك',
-        912842: 'عنب فليم احمر 1ك',
-        912841: 'قصب مقشر350جم',
-        912840: 'قلقاس مكعبات فريش 350 جرام',
-        912839: 'محشى مشكل فريش 350 جرام',
-        912838: 'كوسة مقورة فريش 350 جرام',
-        912837: 'كمثرى افريقي500 جرام',
-        912836: 'فلفل الوان معبأ 500 جرام',
-        911211: 'تفاح اصفر ايطالى 1ك معبأ',
-        911045: 'برتقال عصير 2ك معبأ',
-        911044: 'جوز هند قطعة',
-        911043: 'يوسفي موركت 1ك',
-        911042: 'جوافة 1ك معبأ',
-        911041: 'بطاطا 1ك',
-        911040: 'برتقال بسرة 1ك',
-        911039: 'بطاطس معبأ 1ك',
-        911038: 'بصل احمر معبأ 1ك',
-        911037: 'بصل ابيض معبأ 1ك',
-        911036: 'باذنجان كوبى معبأ 1ك',
-        910161: 'عنب كريمسون لبنانى 500 جرام معبأ',
-        910159: 'قرع مكعبات صافى 350 جرام',
-        910158: 'عبوة ثوم مفصص 100 جرام',
-        910157: 'خضار مشكل فريش 350 جرام',
-        910156: 'سوتيه فريش 350 جرام',
-        910155: 'بسلة مفصصة بالجزر فريش 350 جرام',
-        910154: 'بسلة مفصصة فريش 350 جرام',
-        910153: 'عنب اسود مستورد 500 جرام معبأ',
-        910152: 'موز مستورد 1ك',
-        910151: 'كيوي فاخر 250 جرام معبأ',
-        910150: 'تفاح اخضر امريكى 1ك معبأ',
-        910149: 'تفاح سكرى جالا 1ك معبأ',
-        910148: 'تفاح احمر مستورد 1ك معبأ',
-        910147: 'برقوق احمر مستورد 1ك',
-        910146: 'اناناس سكري فاخر معبأ',
-        910144: 'افوكادو 500 جرام',
-        910142: 'عنب ابيض مستورد 500 جرام',
-        910141: 'موز بلدي فاخر 1ك معبأ',
-        910140: 'كنتالوب 2ك معبأ',
-        910139: 'كزبرة معبأ',
-        910138: 'كرفس فرنساوي 250 جرام',
-        910137: 'شبت معبأ',
-        910136: 'زعتر فريش معبأ',
-        910135: 'ريحان اخضر معبأ',
-        910134: 'روزمارى فريش معبأ',
-        910133: 'جرجير معبأ',
-        910132: 'بقدونس معبأ',
-        910131: 'مشروم 200 جرام معبأ',
-        910130: 'كرنب احمر سلطة معبأ',
-        910129: 'كرنب ابيض سلطة معبأ',
-        910128: 'كابوتشى معبأ',
-        910127: 'زنجبيل 100 جرام معبأ',
-        910126: 'ذرة سكري 2 قطعه',
-        910125: 'خس بلدي فاخر معبأ',
-        910124: 'بصل اخضر معبأ',
-        910123: 'ليمون بلدى فاخر معبأ 250 جرام',
-        910122: 'ليمون اضاليا 250 جرام',
-        910121: 'كوسة معبأ 500 جرام',
-        910120: 'كرات 250 جرام',
-        910119: 'قرنبيط 500 جرام',
-        910117: 'فلفل اخضر حار معبأ 250 جرام',
-        910116: 'فجل احمر 500 جرام',
-        910115: 'طماطم فاخر معبأ 1ك',
-        910114: 'طماطم شيرى معبأ 250 جرام',
-        910113: 'خيار فاخر معبأ 1ك',
-        910112: 'جزر معبأ 500 جرام',
-        910111: 'بنجر احمر معبأ 500 جرام',
-        910110: 'بروكلي 500 جرام',
-        910108: 'باذنجان عروس اسود معبأ 1 كيلو',
-        912853: 'عنب اسود 1ك',
-        910109: 'باذنجان عروس ابيض معبأ 1 كيلو',
-        910118: 'فلفل حار احمر 250 جرام',
-        910143: 'فراوله 250 جرام',
-        910145: 'كمثري لبناني 500 جرام',
-        910160: 'حرنكش مقشر 250 جرام',
-        911046: 'برقوق اصفر مستورد 1ك',
-        911047: 'بلح عراقي 1ك',
-        911212: 'بطيخ',
-        911213: 'بطيخ احمر بدون بذر',
-        911214: 'بطيخ اصفر بدون بذر',
-        911215: 'خوخ سكرى',
-        924865: 'بسلة 500 جم',
-        924866: 'فاصوليا خضراء 500جم',
-        924869: 'جريب فروت ابيض 1كجم',
-        924870: 'جريب فروت احمر 1كجم',
-        924872: 'خوخ محلي 1كجم',
-        924863: 'يوسفي كريستينا 1كجم',
-        912835: 'شمام شهد 1ك معبأ',
-        912845: 'برقوق احمر محلي 1ك', 
-        912842: 'عنب فليم احمر 1ك',
-        933022: "اسباراجوس 250 جرام",
-        933021: "خضار سوتيه شوي 350 جرام",
-        933020: "مانجو سكري 1 ك",
-        933023: "مانجو نعومي 1 ك",
-        933018: "بطاطس ودجز 350 جرام",
-        933019: "بطاطا حلوة حلقات 350 جرام",
-        933024: "مانجو تيمور 1 ك",
-        933017: "نعناع 100 جرام",
-        935792: "مانجو كيت 1.5 كجم",
-        936290 : "خضار.كوم فلفل ألوان اصفر 500 جرام",
-        936291 : "خضار.كوم فلفل ألوان احمر 500 جرام",
-        936294 : "خضار.كوم بنجر 1 كيلو معبأ",
-        936295 : "خضار.كوم ليمون جراس 200 جرام",
-        936296 : "خضار.كوم ليمون اخضر 500 جرام",
-        936293 : "خضار.كوم ليمون اضاليا 500 جرام",
-        936297 : "خضار.كوم جوز هند مقطع 350 جرام",
-        936327 : "خضار.كوم فجل ابيض 500 جرام",
-        936328 : "خضار.كوم كرنب بلدي قطعه",
-        936329 : "خضار.كوم قشطة عبدالرازق 500 جرام" ,
-        936292 : "تفاح مشكل 1كجم"      
-            }
-
 columns = [
         "No.", 
         "SKU", 
@@ -517,6 +76,21 @@ branches_translation_tlbt = {
     
 }
 
+branches_translation_rabbit = {
+    "ميفيدا": "Mevida",
+    "فرع المعادي": "MAADI",
+    "فرع الدقي": "MOHANDSEEN",
+    "فرع الرحاب": "Rehab",
+    "فرع التجمع": "TGAMOE",
+    "فرع مصر الجديدة": "MASR GEDIDA",
+    "فرع مدينة نصر": "Nasr City",
+    "اكتوبر٢": "OCTOBER",
+    "فرع دريم": "Dream",
+    "فرع زايد": "ZAYED",
+    "فرع سوديك": "Sodic",
+    "مدينتي": "Madinaty"
+}
+
 branches_dict = {
         "EG_Alex East_DS_26": "سيدي بشر",
         "EG_Alex West_DS_27": "الابراهيميه",
@@ -701,100 +275,16 @@ def upload_order_and_metadata(
     return insert_response.json()
 
 
+# The product catalogue (barcode_to_product, categories_dict, translation_dict,
+# ids_to_products) lives in catalogue.json and is loaded on first access through
+# catalogue.py, which reloads it when the file changes. `config.translation_dict` always
+# gives the current data; a name imported with `from config import ...` keeps the data it
+# was imported with.
+CATALOGUE_NAMES = ("barcode_to_product", "categories_dict", "translation_dict", "ids_to_products")
 
 
-
-
-ids_to_products = {
-    "6484932": "تفاح اخضر امريكى 1ك معبأ",
-    "6484870": "تفاح سكرى جالا 1ك معبأ",
-    "20077435": "باذنجان كوبى معبأ 1ك",
-    "6485996": "ليمون بلدى فاخر معبأ 250 جرام",
-    "8698992": "بنجر احمر معبأ 500 جرام",
-    "6485637": "جزر معبأ 500 جرام",
-    "6485706": "طماطم شيرى معبأ 250 جرام",
-    "6485838": "فلفل الوان معبأ 500 جرام",
-    "20076507": "كزبرة معبأ",
-    "6485672": "خيار فاخر معبأ 1ك",
-    "20076505": "شبت معبأ",
-    "6484003": "باذنجان للحشو 350جم",
-    "8698619": "زنجبيل 100 جرام معبأ",
-    "6485525": "بصل ابيض معبأ 1ك",
-    "6485820": "فلفل اخضر كوبي 250جم",
-    "20076511": "بصل اخضر معبأ",
-    "6485785": "فلفل اخضر حار معبأ 250 جرام",
-    "20076502": "زعتر فريش معبأ",
-    "6486077": "كابوتشى معبأ",
-    "6484774": "افوكادو 500 جرام",
-    "6484824": "تفاح احمر مستورد 1ك معبأ",
-    "6484967": "تفاح اصفر ايطالى 1ك معبأ",
-    "6484997": "كيوي فاخر 250 جرام معبأ",
-    "20076130": "موز بلدي فاخر 1ك معبأ",
-    "6484550": "محشى مشكل فريش 350 جرام",
-    "20072711": "تفاح مشكل 1كجم",
-    "6484706": "مشروم 200 جرام معبأ",
-    "6484357": "عبوة ثوم مفصص 100 جرام",
-    "6485610": "بطاطس معبأ 1ك",
-    "6484454": "فاصوليا مقطعة فريش 350 جرام",
-    "6485575": "بصل احمر معبأ 1ك",
-    "20076497": "روزمارى فريش معبأ",
-    "20076494": "جرجير معبأ",
-    "6484405": "سوتيه فريش 350 جرام",
-    "6485745": "طماطم فاخر معبأ 1ك",
-    "20076514": "كوسة معبأ 500 جرام",
-    "6484515": "كوسة مقورة فريش 350 جرام",
-    "6485351": "مانجو عويس 1 ك",
-    "6485090": "مانجو صديقة 1ك",
-    "32208358": "نعناع 50 جرام",
-    # Review from here
-    "20072711": "تفاح مشكل 1كجم",
-    "20076127": "كنتالوب 2ك معبأ",
-    "20076133": "خوخ سكري 1 كجم",
-    "20076483": "ثوم صيني ابيض 200جم",
-    "20072717": "بطيخ",
-    "20076498": "ريحان اخضر معبأ",
-    "20076506": "كرفس فرنساوي 250 جرام",
-    "20076509": "خس بلدي فاخر معبأ",
-    "20077433": "عنب ايرلي سويت ابيض 1ك",
-    "20076488": "فجل احمر 500 جرام",
-    "20077434": "عنب فليم احمر 1ك",
-    "6485045":"موز مستورد 1ك",
-    "6485132": "مانجو زبدية 1ك",
-    "20076491": "بقدونس معبأ",
-    "38257420": "برقوق احمر محلي 1ك",
-    "38257421": "ملوخية جاهزة500جم",
-    "38257422": "مانجو سكري 1 ك",
-    "6485249": "عنب اسود 1ك",
-    "6485401": "مانجو فص عويس 500 جم",
-    "6486150": "كرنب احمر سلطة معبأ",
-    "20076123": "برتقال عصير 2ك معبأ",
-    "6485472": "بلح برحي 500 جم",
-    "20072706": "اناناس سكري فاخر معبأ",
-    "6484651": "رمان 1كجم",
-    "6485878": "ليمون اضاليا 500 جرام",
-    "6486032": "ذرة سكري 2 قطعه",
-    "6486117": "كرنب ابيض سلطة معبأ",
-    "7454579": "يوسفي بلدي 1كجم",
-    "7455594": "برتقال بسرة 1ك",
-    "8698441": "يوسفي موركت 1ك",
-    "46434918": "فلفل اخضر كوبي 500جم",
-    "46436266": "بصل اخضر معبأ 200جم",
-    "8699240":"بروكلي 500 جرام"
-}
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def __getattr__(name):
+    if name in CATALOGUE_NAMES:
+        from catalogue import catalogue
+        return catalogue()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
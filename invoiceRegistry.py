@@ -0,0 +1,176 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import zipfile
+import threading
+from datetime import datetime, timezone
+from io import BytesIO
+from contextlib import closing
+
+import pandas as pd
+
+# Where every invoice number went: its PO, client, branch, delivery date, the workbook it
+# was written to (file name and SHA-256 of the workbook bytes) and, once the bundle is
+# uploaded, the storage object holding it. Converters register invoices as they render
+# them; the uploaders link the stored object by matching workbook hashes, so nothing has
+# to agree on file names. Invoice numbers and PO numbers are indexed, so a number, a range
+# of numbers or a PO prefix is one B-tree range scan. Registering never fails a run: any
+# error is printed and generation goes on. Set KHODAR_INVOICE_REGISTRY_PATH to an empty
+# string to turn it off. The registry is kept in shared storage between runs by
+# stateStore, so the portal finds invoices the worker generated.
+REGISTRY_PATH = os.environ.get(
+    "KHODAR_INVOICE_REGISTRY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "invoices.sqlite")
+)
+
+# one record per invoice workbook; updated_at (UTC) tells two copies of it apart
+STORE_TABLE = "invoices"
+STORE_KEY = ("invoice_number", "client", "file_name")
+STORE_STAMP = "updated_at"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    invoice_number INTEGER NOT NULL,
+    po TEXT,
+    client TEXT NOT NULL,
+    branch TEXT,
+    delivery_date TEXT,
+    file_name TEXT,
+    sha256 TEXT,
+    object_key TEXT,
+    registered_at TEXT,
+    updated_at TEXT,
+    -- branch files of one label share a number, so a number can have several workbooks
+    UNIQUE (invoice_number, client, file_name)
+);
+CREATE INDEX IF NOT EXISTS invoices_po ON invoices (po);
+CREATE INDEX IF NOT EXISTS invoices_sha256 ON invoices (sha256);
+"""
+
+_lock = threading.Lock()
+
+
+def _connect(path: str = None) -> sqlite3.Connection:
+    connection = sqlite3.connect(path or REGISTRY_PATH, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SCHEMA)
+    if "updated_at" not in {row[1] for row in connection.execute("PRAGMA table_info(invoices)")}:
+        connection.execute("ALTER TABLE invoices ADD COLUMN updated_at TEXT")
+    return connection
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def content_hash(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def register_invoices(client: str, delivery_date, entries, path: str = None) -> int:
+    """
+    Records the invoices of one run, replacing earlier records of the same number, client
+    and file.
+    Args:
+        entries: (invoice_number, po, branch, file_name, workbook bytes) per invoice
+    """
+    if not (path or REGISTRY_PATH):
+        return 0
+    day = delivery_date
+    try:
+        entries = list(entries)
+        if not entries:
+            return 0
+        try:
+            day = pd.Timestamp(delivery_date).date().isoformat()
+        except (ValueError, TypeError):
+            day = str(delivery_date)
+        now = _now()
+        rows = [
+            (int(number), None if pd.isna(po) or str(po).strip() == "" else str(po), client, branch, day,
+             file_name, content_hash(data), None, now, now)
+            for number, po, branch, file_name, data in entries
+        ]
+        with _lock, closing(_connect(path)) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO invoices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    except Exception as e:
+        # bookkeeping only: whatever goes wrong here, the invoices are still produced
+        print(f"Could not register {client} invoices for {day}: {e!r}")
+        return 0
+    return len(rows)
+
+
+def _workbooks(data: bytes, name: str, member: str = "", depth: int = 2):
+    # (path inside the upload, bytes) of every workbook in it, looking into nested archives;
+    # the path is "" when the upload is itself a workbook
+    if name.lower().endswith(".xlsx"):
+        yield member, data
+    elif name.lower().endswith(".zip") and depth:
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            for inner in archive.namelist():
+                if inner.lower().endswith((".xlsx", ".zip")):
+                    inner_path = f"{member}/{inner}" if member else inner
+                    yield from _workbooks(archive.read(inner), inner, inner_path, depth - 1)
+
+
+def link_artifact(data: bytes, file_name: str, object_key: str, path: str = None) -> int:
+    """
+    Points every registered invoice whose workbook is in the upload `data` (a workbook or a
+    ZIP of them) at `object_key`, with the member path inside the archive after a "#".
+    Returns the number of invoices linked.
+    """
+    if not (path or REGISTRY_PATH):
+        return 0
+    try:
+        now = _now()
+        updates = [
+            (f"{object_key}#{member}" if member else object_key, now, content_hash(workbook))
+            for member, workbook in _workbooks(data, file_name)
+        ]
+        with _lock, closing(_connect(path)) as connection, connection:
+            before = connection.total_changes
+            connection.executemany("UPDATE invoices SET object_key = ?, updated_at = ? WHERE sha256 = ?", updates)
+            return connection.total_changes - before
+    except Exception as e:
+        print(f"Could not link the invoices in {file_name} to {object_key}: {e!r}")
+        return 0
+
+
+def _select(where: str, params: list, path: str = None) -> pd.DataFrame:
+    with closing(_connect(path)) as connection:
+        return pd.read_sql_query(f"SELECT * FROM invoices WHERE {where} ORDER BY invoice_number", connection, params=params)
+
+
+def find_invoices(first: int, last: int = None, path: str = None) -> pd.DataFrame:
+    """Invoices numbered `first` to `last` (both inclusive; just `first` when no `last`)."""
+    return _select("invoice_number BETWEEN ? AND ?", [int(first), int(last if last is not None else first)], path)
+
+
+def find_po(prefix: str, path: str = None) -> pd.DataFrame:
+    """Invoices whose PO number starts with `prefix`."""
+    # a range on the PO index; LIKE would not use it
+    return _select("po >= ? AND po < ?", [str(prefix), f"{prefix}\U0010ffff"], path)
+
+
+def lookup(query: str, path: str = None) -> pd.DataFrame:
+    """
+    "12345" (an invoice number), "12300-12399" (a range) or anything else as a PO prefix;
+    a number that matches no invoice is tried as a PO prefix too.
+    """
+    query = str(query).strip()
+    first, _, last = query.partition("-")
+    if first.strip().isdigit() and (not last or last.strip().isdigit()):
+        found = find_invoices(int(first), int(last) if last else None, path)
+        if not found.empty or last:
+            return found
+    return find_po(query, path)
+
+
+if __name__ == "__main__":
+    # Usage: python invoiceRegistry.py <invoice number | first-last | PO prefix>
+    if len(sys.argv) > 1:
+        with pd.option_context("display.max_columns", None, "display.width", 200):
+            print(lookup(" ".join(sys.argv[1:])).to_string(index=False))
+    else:
+        print("Usage: python invoiceRegistry.py <invoice number | first-last | PO prefix>")
@@ -0,0 +1,167 @@
+import sys
+import time
+import weakref
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+from assetCache import LOGO, image_options
+
+# Shared pieces of the "فاتورة" sheet every client invoice carries: the Khodar header
+# block, the line-item table and the Subtotal/Total rows with the company footer.
+# Formats are registered once per workbook, so a workbook holding many invoice sheets
+# (or a table with thousands of rows) still has only a handful of Format objects.
+
+COMPANY_NAME_AR = "شركه خضار للتجارة والتسويق"
+COMPANY_NAME_EN = "Khodar for Trading & Marketing"
+FOOTER_LINES = [
+    "شركة خضار للتجارة و التسويق",
+    "ش.ذ.م.م",
+    "سجل تجارى / 13138  بطاقه ضريبية/721/294/448"
+]
+
+META = {"bold": True, "border": 2}
+META_CENTERED = {"bold": True, "border": 2, "align": "center", "valign": "vcenter"}
+PO_FORMAT = {"bold": True, "border": 2, "align": "center"}
+HEADER = {"bold": True, "border": 1, "align": "center"}
+BORDER = {"border": 1}
+BARCODE = {"border": 1, "num_format": "0"}
+FOOTER = {"bold": True, "align": "center"}
+
+_formats = weakref.WeakKeyDictionary()
+
+
+def get_format(workbook, properties: dict = None):
+    """The workbook's Format for `properties`, created on first use."""
+    if not properties:
+        return None
+    registry = _formats.setdefault(workbook, {})
+    key = tuple(sorted(properties.items()))
+    fmt = registry.get(key)
+    if fmt is None:
+        fmt = registry[key] = workbook.add_format(properties)
+    return fmt
+
+
+def barcode_cells(values) -> list:
+    # numeric barcodes as whole numbers, anything else as text, blanks as None
+    cells = []
+    for value in values:
+        if value is None or value == "" or pd.isna(value):
+            cells.append(None)
+            continue
+        try:
+            cells.append(int(value))
+        except (TypeError, ValueError):
+            cells.append(str(value))
+    return cells
+
+
+def write_invoice_header(
+    worksheet,
+    workbook,
+    invoice_number,
+    delivery_date,
+    po,
+    client_name: str,
+    branch: str,
+    logo_scale: tuple = (0.5, 0.5),
+    logo_path: str = LOGO,
+    merged_company_name: bool = False,
+    po_format: dict = PO_FORMAT
+) -> None:
+    """
+    Logo, company name and the invoice/date/PO/client/branch block above the table.
+    Args:
+        merged_company_name: company name over B1:C2 merged cells (Rabbit) instead of
+            C1/C2 plus A5
+        logo_path: logo asset, relative to the package directory unless absolute
+        po_format: format properties of the PO cell
+    """
+    meta = get_format(workbook, META)
+    worksheet.insert_image("A1", logo_path, image_options(logo_path, x_scale=logo_scale[0], y_scale=logo_scale[1]))
+
+    if merged_company_name:
+        centered = get_format(workbook, META_CENTERED)
+        worksheet.merge_range("B1:C1", COMPANY_NAME_AR, centered)
+        worksheet.merge_range("B2:C2", COMPANY_NAME_EN, centered)
+    else:
+        worksheet.write("A5", COMPANY_NAME_AR, meta)
+        worksheet.write("C1", COMPANY_NAME_AR, meta)
+        worksheet.write("C2", COMPANY_NAME_EN, meta)
+
+    worksheet.write_column("F1", ["فاتورة مبيعات", "رقم الفاتورة #", "تاريخ الاستلام", "امر شراء رقم"], meta)
+    worksheet.write_column("F6", ["اسم العميل", "الفرع"], meta)
+    worksheet.write_column("E2", [invoice_number, delivery_date], meta)
+    worksheet.write("E4", po, get_format(workbook, po_format))
+    worksheet.write_column("E6", [client_name, branch], meta)
+
+
+def write_item_table(
+    worksheet,
+    workbook,
+    headers: list,
+    columns: list,
+    column_formats: list = None,
+    numeric_barcodes: bool = True,
+    start_row: int = 10
+) -> int:
+    """
+    Header row at `start_row` (0-based) and one column of values per entry of `columns`
+    below it; the first column is the barcode. Returns the first row after the table.
+    Args:
+        column_formats: format properties per column (None leaves a column unformatted);
+            defaults to the barcode format for the first column and borders elsewhere
+        numeric_barcodes: write barcodes as whole numbers; False keeps them as given
+    """
+    if column_formats is None:
+        column_formats = [BARCODE] + [BORDER] * (len(columns) - 1)
+    worksheet.write_row(start_row, 0, headers, get_format(workbook, HEADER))
+    for col, (values, properties) in enumerate(zip(columns, column_formats)):
+        if col == 0 and numeric_barcodes:
+            values = barcode_cells(values)
+        worksheet.write_column(start_row + 1, col, values, get_format(workbook, properties))
+    return start_row + 1 + max((len(values) for values in columns), default=0)
+
+
+def write_invoice_totals(worksheet, workbook, last_row: int, total=None) -> None:
+    """Subtotal and Total rows from `last_row`, then the company footer two rows below."""
+    merged = get_format(workbook, META_CENTERED)
+    meta = get_format(workbook, META)
+    worksheet.merge_range(last_row, 0, last_row, 3, "Subtotal", merged)
+    worksheet.write_blank(last_row, 4, None, meta)
+    worksheet.merge_range(last_row + 1, 0, last_row + 1, 3, "Total", merged)
+    worksheet.write(last_row + 1, 4, total, meta)
+
+    footer = get_format(workbook, FOOTER)
+    for row, text in enumerate(FOOTER_LINES, start=last_row + 3):
+        worksheet.merge_range(row, 0, row, 3, text, footer)
+
+
+def benchmark_invoice_render(rows: int = 500, invoices: int = 20) -> float:
+    """Milliseconds per invoice sheet for a synthetic table of `rows` lines."""
+    barcodes = [6220000000000 + i for i in range(rows)]
+    names = [f"منتج {i}" for i in range(rows)]
+    prices = [round(5 + i * 0.25, 2) for i in range(rows)]
+    blanks = [""] * rows
+
+    start = time.perf_counter()
+    workbook = xlsxwriter.Workbook(BytesIO(), {"in_memory": True})
+    for n in range(invoices):
+        worksheet = workbook.add_worksheet(f"فاتورة {n}")
+        write_invoice_header(worksheet, workbook, 1000 + n, "2025-01-01", f"PO{n}", "client", "branch")
+        last_row = write_item_table(
+            worksheet, workbook, ["Barcode", "Product Name", "PP", "Qty", "Total"],
+            [barcodes, names, prices, blanks, blanks]
+        )
+        write_invoice_totals(worksheet, workbook, last_row)
+    workbook.close()
+    return (time.perf_counter() - start) * 1000 / invoices
+
+
+if __name__ == "__main__":
+    # Usage: python invoiceRenderer.py [rows] [invoices]
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    invoices = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{benchmark_invoice_render(rows, invoices):.1f} ms per invoice of {rows} rows")
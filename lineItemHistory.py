@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+# Every invoiced PO line (client, branch, PO, invoice number, delivery date, SKU, barcode,
+# product, quantity, unit price) is appended to a local SQLite table when a converter runs,
+# so questions like "how much of a product did Talabat Cairo take last month" are one
+# indexed query instead of downloading and re-parsing workbooks from storage. Rerunning a
+# PO replaces its earlier lines. Recording never fails a run: any error (a bad cell, a
+# locked store) is printed and the invoices are produced as usual. Set KHODAR_HISTORY_PATH
+# to an empty string to turn recording off. The store is kept in shared storage between
+# runs by stateStore.
+HISTORY_PATH = os.environ.get(
+    "KHODAR_HISTORY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "line_items.sqlite")
+)
+
+COLUMNS = ["client", "branch", "po", "invoice_number", "delivery_date",
+           "sku", "barcode", "product_name", "qty", "unit_price", "recorded_at"]
+# the lines of one PO are replaced together; recorded_at (UTC) tells two copies apart
+STORE_TABLE = "line_items"
+STORE_KEY = ("client", "delivery_date", "branch", "po")
+STORE_STAMP = "recorded_at"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS line_items (
+    client TEXT NOT NULL,
+    branch TEXT,
+    po TEXT,
+    invoice_number INTEGER,
+    delivery_date TEXT NOT NULL,
+    sku TEXT,
+    barcode TEXT,
+    product_name TEXT,
+    qty REAL,
+    unit_price REAL,
+    recorded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS line_items_date ON line_items (delivery_date, client, branch);
+CREATE INDEX IF NOT EXISTS line_items_product ON line_items (product_name, delivery_date);
+CREATE INDEX IF NOT EXISTS line_items_barcode ON line_items (barcode, delivery_date);
+CREATE INDEX IF NOT EXISTS line_items_sku ON line_items (sku, delivery_date);
+"""
+
+_lock = threading.Lock()
+
+
+def _connect(path: str = None) -> sqlite3.Connection:
+    connection = sqlite3.connect(path or HISTORY_PATH, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SCHEMA)
+    if "recorded_at" not in {row[1] for row in connection.execute("PRAGMA table_info(line_items)")}:
+        connection.execute("ALTER TABLE line_items ADD COLUMN recorded_at TEXT")
+    return connection
+
+
+def _text(values: pd.Series) -> list:
+    # codes as digit strings (no ".0" from float columns); blanks, None, NaN and NA as NULL
+    out = []
+    for value in values.tolist():
+        if pd.isna(value) or (isinstance(value, str) and not value.strip()):
+            out.append(None)
+        elif isinstance(value, float) and value.is_integer():
+            out.append(str(int(value)))
+        else:
+            out.append(str(value).strip())
+    return out
+
+
+def _numbers(values: pd.Series) -> list:
+    numbers = pd.to_numeric(values, errors="coerce").astype(float)
+    return [None if np.isnan(n) else n for n in numbers.tolist()]
+
+
+def record_line_items(client: str, delivery_date, invoices, columns: dict, path: str = None) -> int:
+    """
+    Stores the lines of every invoice of one run, replacing lines stored earlier for the
+    same client, delivery date, branch and PO. Returns the number of lines stored.
+    Args:
+        invoices: (branch, po, invoice_number, items DataFrame) per invoice
+        columns: {"sku" | "barcode" | "product_name" | "qty" | "unit_price": items column};
+            fields left out are stored as NULL
+    """
+    if not (path or HISTORY_PATH):
+        return 0
+    day = delivery_date
+    try:
+        invoices = list(invoices)
+        if not invoices:
+            return 0
+        try:
+            day = pd.Timestamp(delivery_date).date().isoformat()
+        except (ValueError, TypeError):
+            day = str(delivery_date)
+
+        now = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        deletes, rows = [], []
+        for branch, po, invoice_number, items in invoices:
+            po = None if pd.isna(po) or str(po).strip() == "" else str(po)
+            deletes.append((client, day, branch, po))
+            n = len(items)
+            fields = {
+                field: (_numbers if field in ("qty", "unit_price") else _text)(items[column])
+                for field, column in columns.items() if column in items.columns
+            }
+            number = None if pd.isna(invoice_number) else int(invoice_number)
+            rows.extend(zip(
+                [client] * n, [branch] * n, [po] * n, [number] * n, [day] * n,
+                *(fields.get(field, [None] * n) for field in COLUMNS[5:10]), [now] * n
+            ))
+
+        with _lock, closing(_connect(path)) as connection:
+            with connection:
+                connection.executemany(
+                    "DELETE FROM line_items WHERE client = ? AND delivery_date = ? AND branch IS ? AND po IS ?",
+                    deletes
+                )
+                connection.executemany(f"INSERT INTO line_items VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            # sampled planner statistics, without which product lookups scan by client
+            connection.execute("PRAGMA analysis_limit = 1000")
+            connection.execute("ANALYZE")
+    except Exception as e:
+        # bookkeeping only: whatever goes wrong here, the invoices are still produced
+        print(f"Could not record {client} line items for {day}: {e!r}")
+        return 0
+    return len(rows)
+
+
+def _filters(client, branch, product, start, end) -> tuple:
+    clauses, params = [], []
+    for column, value in (("client", client), ("branch", branch)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if product is not None:
+        clauses.append("(product_name = ? OR barcode = ? OR sku = ?)")
+        params += [str(product)] * 3
+    if start is not None:
+        clauses.append("delivery_date >= ?")
+        params.append(pd.Timestamp(start).date().isoformat())
+    if end is not None:
+        clauses.append("delivery_date <= ?")
+        params.append(pd.Timestamp(end).date().isoformat())
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def query_line_items(client: str = None, branch: str = None, product: str = None,
+                     start=None, end=None, path: str = None) -> pd.DataFrame:
+    """
+    Stored lines matching every given filter; `product` is a product name, barcode or SKU
+    and `start`/`end` bound the delivery date, both inclusive.
+    """
+    where, params = _filters(client, branch, product, start, end)
+    with closing(_connect(path)) as connection:
+        return pd.read_sql_query(f"SELECT * FROM line_items{where} ORDER BY delivery_date", connection, params=params)
+
+
+def product_totals(client: str = None, branch: str = None, start=None, end=None, path: str = None) -> pd.DataFrame:
+    """Quantity and value per product over the filtered lines, largest quantity first."""
+    where, params = _filters(client, branch, None, start, end)
+    with closing(_connect(path)) as connection:
+        return pd.read_sql_query(
+            f"SELECT product_name, SUM(qty) AS qty, SUM(qty * unit_price) AS value FROM line_items{where} "
+            "GROUP BY product_name ORDER BY qty DESC",
+            connection, params=params
+        )
+
@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import Optional
+
+import pandas as pd
+
+# Parsed purchase orders are cached on local disk as Parquet, keyed by the SHA-256 of the
+# uploaded bytes plus the parser version, so rerunning a day or retrying a failed upload
+# goes straight to rendering. Least recently used entries are evicted past the size cap.
+CACHE_DIR = os.environ.get(
+    "KHODAR_PARSE_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "khodar_parse_cache")
+)
+CACHE_MAX_BYTES = int(os.environ.get("KHODAR_PARSE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+META_KEY = b"khodar_meta"
+
+
+def cache_key(data: bytes, parser: str, version: str, *salts: str) -> str:
+    """
+    Key for one input under one parser version. `salts` are extra strings that change the
+    parse result (e.g. the branch lookup table) and must invalidate the entry.
+    """
+    digest = hashlib.sha256(data)
+    for salt in salts:
+        digest.update(salt.encode("utf-8"))
+    return f"{parser}-v{version}-{digest.hexdigest()}"
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.parquet")
+
+
+def load_parsed(key: str) -> Optional[tuple]:
+    """Returns (line_items_df, meta) for a cached parse, or None on a miss."""
+    path = _entry_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(META_KEY, b"{}"))
+        df = table.to_pandas()
+    except Exception as e:
+        print(f"Parse cache entry {key} unreadable, reparsing: {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    # touch so eviction sees it as recently used
+    os.utime(path)
+    return df, meta
+
+
+def store_parsed(key: str, df: pd.DataFrame, meta: dict) -> None:
+    """Stores a parse result; failures only cost the cache, never the order."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[META_KEY] = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+
+        path = _entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        _evict()
+    except Exception as e:
+        print(f"Could not cache parse result {key}: {e}")
+
+
+def _evict() -> None:
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".parquet"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+import pdfplumber
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+# pdfplumber keeps every page's parsed layout cached until the document is closed, so
+# pages are closed as soon as they have been read and only a few documents are open at
+# once. Peak memory then depends on the largest page, not on pages or PDFs per order.
+MAX_OPEN_PDFS = int(os.environ.get("KHODAR_MAX_OPEN_PDFS", 2))
+_open_slots = threading.BoundedSemaphore(MAX_OPEN_PDFS)
+
+# Engine for page text: "pdfplumber" (pdfminer.six), "pdfium" (pypdfium2, compiled) or
+# "auto" (pdfium when installed). Tables always come from pdfplumber. tests/test_pdfReader.py
+# holds every engine to the golden text of a fixture PO; check a new engine against real
+# POs with `python pdfReader.py <pdf>...` as well before switching.
+PDF_TEXT_BACKEND = os.environ.get("KHODAR_PDF_TEXT_BACKEND", "pdfplumber")
+
+
+def peak_rss_mb():
+    """Process peak resident memory in MB, or None where the platform does not report it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def available_text_backends() -> list:
+    return ["pdfplumber"] + (["pdfium"] if pypdfium2 is not None else [])
+
+
+def text_backend(backend: str = None) -> str:
+    backend = backend or PDF_TEXT_BACKEND
+    if backend == "auto":
+        return "pdfium" if pypdfium2 is not None else "pdfplumber"
+    if backend not in ("pdfplumber", "pdfium"):
+        raise ValueError(f"Unknown PDF text backend: {backend}")
+    if backend == "pdfium" and pypdfium2 is None:
+        raise ValueError("PDF text backend 'pdfium' needs the pypdfium2 package")
+    return backend
+
+
+@contextmanager
+def _document_slot(label: str):
+    # Holds one of the open-document slots and reports the memory high-water mark after
+    report = {"pages": 0}
+    with _open_slots:
+        rss_before = peak_rss_mb()
+        yield report
+        rss_after = peak_rss_mb()
+    if rss_after is not None:
+        print(f"{label}: {report['pages']} pages, peak RSS {rss_after:.0f} MB (+{rss_after - rss_before:.0f} MB)")
+
+
+def _label_for(source, label):
+    if label is not None:
+        return label
+    return os.path.basename(source) if isinstance(source, str) else "PDF"
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _pdfplumber_pages(source, label, text, tables) -> list:
+    pages = []
+    with _document_slot(label) as report:
+        with pdfplumber.open(_rewind(source)) as pdf:
+            for page in pdf.pages:
+                try:
+                    result = {}
+                    if text:
+                        result["text"] = page.extract_text()
+                    if tables:
+                        result["tables"] = page.extract_tables()
+                    pages.append(result)
+                finally:
+                    page.close()
+        report["pages"] = len(pages)
+    return pages
+
+
+def _pdfium_texts(source, label) -> list:
+    data = source.getvalue() if hasattr(source, "getvalue") else source
+    texts = []
+    with _document_slot(label) as report:
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                try:
+                    # pdfium separates lines with CRLF; pdfplumber uses LF
+                    texts.append(textpage.get_text_bounded().replace("\r\n", "\n"))
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+        report["pages"] = len(texts)
+    return texts
+
+
+def extract_pages(source, label: str = None, text: bool = True, tables: bool = False,
+                  backend: str = None) -> list:
+    """
+    Reads a PDF page by page, releasing each page's layout cache after use.
+    Args:
+        source: path or binary file object of the PDF
+        label: name used in the memory report (defaults to the file name)
+        text: include the page text (None for pages without text under pdfplumber)
+        tables: include page.extract_tables()
+        backend: text engine, defaults to PDF_TEXT_BACKEND
+    Returns:
+        One dict per page with the requested "text" and/or "tables" keys.
+    """
+    label = _label_for(source, label)
+    backend = text_backend(backend) if text else "pdfplumber"
+
+    if backend == "pdfplumber":
+        return _pdfplumber_pages(source, label, text, tables)
+
+    texts = _pdfium_texts(source, label)
+    if not tables:
+        return [{"text": t} for t in texts]
+    pages = _pdfplumber_pages(source, label, False, True)
+    for page, page_text in zip(pages, texts):
+        page["text"] = page_text
+    return pages
+
+
+def benchmark_text_backends(source, repeat: int = 3) -> dict:
+    """Pages per second of plain text extraction for every installed backend."""
+    results = {}
+    for backend in available_text_backends():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pages = extract_pages(source, label=f"benchmark {backend}", backend=backend)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[backend] = len(pages) / best if best else float("inf")
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python pdfReader.py <pdf> [<pdf> ...]
+    # Compares pages/second per backend and whether Breadfast line items parse identically.
+    from breadfastInvoices import parse_line_items
+
+    for path in sys.argv[1:]:
+        print(f"== {path}")
+        for backend, rate in benchmark_text_backends(path).items():
+            print(f"{backend}: {rate:.1f} pages/s")
+
+        rows = {}
+        for backend in available_text_backends():
+            pages = extract_pages(path, backend=backend)
+            all_text = "".join("\n" + page["text"] for page in pages if page["text"])
+            rows[backend] = parse_line_items(all_text)
+        reference = rows.pop("pdfplumber")
+        for backend, parsed in rows.items():
+            status = "identical" if parsed.equals(reference) else "DIFFERENT"
+            print(f"{backend} vs pdfplumber: {len(parsed)} vs {len(reference)} line items, {status}")
@@ -9,11 +9,16 @@ from halanInvoices import build_master_and_invoices_bytes
 from rabbitInvoices import rabbitInvoices
 from pdfsToExcels import process_talabat_invoices
 from breadfastInvoices import process_breadfast_invoice
+from zipBundle import repack
+from catalogueSync import sync_catalogue
+from branchRegistry import report_branch_misses, reset_branch_misses
+from invoiceRegistry import REGISTRY_PATH, link_artifact, lookup
+from stateStore import pull_stores, push_stores
+import config
 from config import (
-    translation_dict,
-    categories_dict,
     branches_dict,
     branches_translation_tlbt,
+    branches_translation_rabbit,
     columns
 )
 import os
@@ -93,6 +98,8 @@ def upload_order_and_metadata(
         )
     os.remove(tmp_path)
     up.raise_for_status()
+    if order_type == "Invoice":
+        link_artifact(file_bytes, filename, f"{STORAGE_BUCKET}/{object_name}")
     file_url = f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/{object_name}"
 
     # insert metadata record
@@ -145,6 +152,9 @@ def download_from_url(url: str) -> bytes:
 # --- Main Processing ---
 if st.button("Generate Job Orders & Invoices"):
     with st.spinner("Fetching and processing files..."):
+        sync_catalogue()
+        reset_branch_misses()
+        pull_stores()
         orders = fetch_pending_orders()
         if not orders:
             st.info("No pending orders found.")
@@ -209,37 +219,20 @@ if st.button("Generate Job Orders & Invoices"):
                             data,
                             invoice_number,
                             order.get("delivery_date"),
-                            branches_translation={
-                                        "ميفيدا": "Mevida",
-                                        "فرع المعادي": "MAADI",
-                                        "فرع الدقي": "MOHANDSEEN",
-                                        "فرع الرحاب": "Rehab",
-                                        "فرع التجمع": "TGAMOE",
-                                        "فرع مصر الجديدة": "MASR GEDIDA",
-                                        "فرع مدينة نصر": "Nasr City",
-                                        "اكتوبر٢": "OCTOBER",
-                                        "فرع دريم": "Dream",
-                                        "فرع زايد": "ZAYED",
-                                        "فرع سوديك": "Sodic",
-                                        "مدينتي": "Madinaty"
-                                    }
+                            branches_translation=branches_translation_rabbit
                         )
                         invoice_number += idx + 1
                         z = ZipFile(BytesIO(zip_bytes))
                         inner = None; excels = []
                         for n in z.namelist():
-                            c = z.read(n)
-                            if n.lower().endswith('.zip'): inner = c
-                            elif n.lower().endswith('.xlsx'): excels.append((n,c))
+                            if n.lower().endswith('.zip'): inner = z.read(n)
+                            elif n.lower().endswith('.xlsx'): excels.append(n)
                         if inner:
                             upload_order_and_metadata(inner, f"{selected_client}_Invoice_{order['delivery_date']}.zip",
                                                       selected_client, "Invoice", order['order_date'], order['delivery_date'], order.get('po_number'), order.get('city'))
                         if excels:
-                            newz = BytesIO()
-                            with ZipFile(newz,'w') as z2:
-                                for n,c in excels: z2.writestr(n,c)
                             mark_purchase_order_done(selected_client.title(), order.get("delivery_date"), order.get("city"))
-                            upload_order_and_metadata(newz.getvalue(), f"{selected_client}_JobOrder_{order['delivery_date']}.zip",
+                            upload_order_and_metadata(repack(z, excels), f"{selected_client}_JobOrder_{order['delivery_date']}.zip",
                                                       selected_client, "Job Order", order['order_date'], order['delivery_date'], order.get('po_number'), order.get('city'))
 
                     # --- talabat ---
@@ -249,8 +242,8 @@ if st.button("Generate Job Orders & Invoices"):
                             zip_file_bytes=data,
                             invoice_date=d_date,
                             base_invoice_number=invoice_number,
-                            translation_dict=translation_dict,
-                            categories_dict=categories_dict,
+                            translation_dict=config.translation_dict,
+                            categories_dict=config.categories_dict,
                             branches_dict=branches_dict,
                             branches_translation_tlbt=branches_translation_tlbt,
                             columns=columns
@@ -259,18 +252,14 @@ if st.button("Generate Job Orders & Invoices"):
                         z = ZipFile(BytesIO(zip_bytes))
                         inner = None; excels = []
                         for n in z.namelist():
-                            c = z.read(n)
-                            if n.lower().endswith('.zip'): inner = c
-                            elif n.lower().endswith('.xlsx'): excels.append((n,c))
+                            if n.lower().endswith('.zip'): inner = z.read(n)
+                            elif n.lower().endswith('.xlsx'): excels.append(n)
                         if inner:
                             upload_order_and_metadata(inner, f"Talabat_Invoice_{d_date}.zip",
                                                       "Talabat", "Invoice", order['order_date'], d_date, order.get('po_number'), order.get('city'))
                         if excels:
-                            newz = BytesIO()
-                            with ZipFile(newz,'w') as z2:
-                                for n,c in excels: z2.writestr(n,c)
                             mark_purchase_order_done("Talabat", d_date, order.get("city"))
-                            upload_order_and_metadata(newz.getvalue(), f"Talabat_JobOrder_{d_date}.zip",
+                            upload_order_and_metadata(repack(z, excels), f"Talabat_JobOrder_{d_date}.zip",
                                                       "Talabat", "Job Order", order['order_date'], d_date, order.get('po_number'), order.get('city'))
 
                     # --- breadfast ---
@@ -287,27 +276,42 @@ if st.button("Generate Job Orders & Invoices"):
                         z = ZipFile(BytesIO(zip_bytes))
                         jobf = []; invf = []
                         for n in z.namelist():
-                            c = z.read(n)
-                            if 'مجمع' in n: jobf.append((n,c))
-                            else: invf.append((n,c))
+                            if 'مجمع' in n: jobf.append(n)
+                            else: invf.append(n)
                         if jobf:
-                            jz = BytesIO()
-                            with ZipFile(jz,'w') as z2:
-                                for n,c in jobf: z2.writestr(n,c)
-                            upload_order_and_metadata(jz.getvalue(), f"Breadfast_JobOrder_{city}_{d_date}.zip",
+                            upload_order_and_metadata(repack(z, jobf), f"Breadfast_JobOrder_{city}_{d_date}.zip",
                                                       "Breadfast", "Job Order", order['order_date'], d_date, order.get('po_number'), city)
                         if invf:
-                            iz = BytesIO()
-                            with ZipFile(iz,'w') as z2:
-                                for n,c in invf: z2.writestr(n,c)
-                            upload_order_and_metadata(iz.getvalue(), f"Breadfast_Invoices_{city}_{d_date}.zip",
+                            upload_order_and_metadata(repack(z, invf), f"Breadfast_Invoices_{city}_{d_date}.zip",
                                                       "Breadfast", "Invoice", order['order_date'], d_date, order.get('po_number'), city)
                         mark_purchase_order_done("Breadfast", d_date, city)
 
                 except Exception as e:
                     st.error(f"Error processing {file_name}: {e}")
 
+        push_stores()
+
         # --- Update Invoice Number in Sheet ---
         df_inv.iat[0, 0] = invoice_number
         conn.update(worksheet="Saved", data=df_inv)
         st.success("✅ Finished processing all orders.")
+        unknown_branches = report_branch_misses()
+        if unknown_branches:
+            st.warning("Branch names missing from the branch tables:\n" + unknown_branches)
+
+# --- Invoice Lookup ---
+st.subheader("🔎 Invoice Lookup")
+invoice_query = st.text_input("Invoice number, invoice range (first-last) or PO number")
+if invoice_query:
+    # invoices the worker generated arrive through shared storage
+    pull_stores([REGISTRY_PATH], max_age=60)
+    try:
+        found = lookup(invoice_query)
+    except Exception as e:
+        # a missing, corrupt or locked registry must not take the page down
+        st.warning(f"Invoice lookup is unavailable right now: {e}")
+    else:
+        if found.empty:
+            st.info("No generated invoice matches.")
+        else:
+            st.dataframe(found, use_container_width=True, hide_index=True)
@@ -5,11 +5,50 @@ import io
 from datetime import datetime
 import xlsxwriter
 from streamlit_gsheets import GSheetsConnection
+from invoiceRenderer import META, write_invoice_header, write_item_table, write_invoice_totals
+from xlsxStream import write_frame
+from renderPool import render_all
+from zipBundle import add_member, nested_archive
+from sheetReader import read_sheet, grid_frame
+from aggregation import pivot_branches
+from branchRegistry import resolve_branch
+from lineItemHistory import record_line_items
+from invoiceRegistry import register_invoices
 
 import io
 import zipfile
 import pandas as pd
 
+def render_rabbit_invoice(df, invoice_number, delivery_date, order_number, prefix, branch, invoice_total) -> bytes:
+    """One branch workbook: the source rows on "Data" and the فاتورة sheet."""
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Data")
+        workbook = writer.book
+        invoice_ws = workbook.add_worksheet("فاتورة")
+        write_invoice_header(
+            invoice_ws, workbook, invoice_number, delivery_date, str(order_number),
+            f"{prefix} - فرع {branch}", branch,
+            logo_scale=(1.5, 1), merged_company_name=True, po_format=META
+        )
+
+        def column_values(name):
+            return df[name].tolist() if name in df.columns else [""] * len(df)
+
+        last_row = write_item_table(
+            invoice_ws, workbook,
+            ["Barcode", "Arabic Product Name", "Unit Cost", "quantity", "total"],
+            [column_values("Barcode"), column_values("Arabic Product Name"), column_values("Unit Cost"), [""] * len(df), [""] * len(df)]
+        )
+        write_invoice_totals(invoice_ws, workbook, last_row, invoice_total)
+
+        invoice_ws.set_column("A:A", 25)
+        invoice_ws.set_column("B:B", 30)
+        invoice_ws.set_column("C:E", 15)
+
+    return excel_buffer.getvalue()
+
+
 def rabbitInvoices(zip_bytes: bytes, base_invoice_num: int, delivery_date: str, branches_translation: dict) -> bytes:
     """
     Processes a ZIP of Excel invoices and returns a new ZIP containing:
@@ -30,11 +69,10 @@ def rabbitInvoices(zip_bytes: bytes, base_invoice_num: int, delivery_date: str,
     last_invoice_number = base_invoice_num
 
     with zipfile.ZipFile(output_zip_io, "w", zipfile.ZIP_DEFLATED) as output_zip:
-        khateer_data = []
-        khodar_data = []
+        khateer_data = {}
+        khodar_data = {}
         po_totals_rows = []
-        invoice_zip_buffer = io.BytesIO()
-        invoice_zip = zipfile.ZipFile(invoice_zip_buffer, "w")
+        renders = []
 
         for file_index, file_name in enumerate(zip_ref.namelist()):
             if not file_name.endswith(".xlsx") or file_name.startswith("__MACOSX"):
@@ -42,9 +80,11 @@ def rabbitInvoices(zip_bytes: bytes, base_invoice_num: int, delivery_date: str,
 
             with zip_ref.open(file_name) as file:
                 try:
-                    df = pd.read_excel(file, skiprows=8)
-                    file.seek(0)
-                    df2 = pd.read_excel(file)
+                    # the sheet is read once: the item table starts on row 9, and the branch,
+                    # order number and total are picked from the frame of the whole sheet
+                    grid = read_sheet(file)
+                    df = grid_frame(grid, skiprows=8)
+                    df2 = grid_frame(grid)
                     df = df[:-9].reset_index(drop=True)
 
                     branch = str(df2.iloc[1, 1]).strip()
@@ -68,108 +108,71 @@ def rabbitInvoices(zip_bytes: bytes, base_invoice_num: int, delivery_date: str,
 
                     if not output_filename.startswith("مجمع"):
                         po_totals_rows.append({
-                            "branch 'en'": branches_translation.get(clean_base_name, clean_base_name),
+                            "branch 'en'": resolve_branch("rabbit", clean_base_name, branches_translation),
                             "filename": filename_with_prefix,
                             "PO Number": order_number,
                             "Invoice Total": invoice_total,
                             "Invoice Number": invoice_number
                         })
 
-                    excel_buffer = io.BytesIO()
-                    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-                        df.to_excel(writer, index=False, sheet_name="Data")
-                        workbook = writer.book
-                        invoice_ws = workbook.add_worksheet("فاتورة")
-                        meta_format = workbook.add_format({'bold': True, 'border': 2})
-                        bold_border_right = workbook.add_format({'bold': True, 'border': 2})
-                        bold_center = workbook.add_format({'bold': True, 'align': 'center'})
-                        bold_merge = workbook.add_format({'bold': True, 'border': 2, 'align': 'center', 'valign': 'vcenter'})
-                        headers_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
-                        centered_meta_format = workbook.add_format({'bold': True, 'border': 2, 'align': 'center', 'valign': 'vcenter'})
-                        border_format = workbook.add_format({'border': 1})
-                        barcode_format = workbook.add_format({'num_format': '0', 'border': 1})
-                        qty_total_format = workbook.add_format({'border': 1})
-
-                        try:
-                            invoice_ws.insert_image("A1", "Picture1.png", {'x_scale': 1.5, 'y_scale': 1})
-                        except:
-                            pass
-
-                        invoice_ws.merge_range("B1:C1", "شركه خضار للتجارة والتسويق", centered_meta_format)
-                        invoice_ws.merge_range("B2:C2", "Khodar for Trading & Marketing", centered_meta_format)
-
-                        invoice_ws.write("F1", "فاتورة مبيعات", meta_format)
-                        invoice_ws.write("F2", "رقم الفاتورة #", meta_format)
-                        invoice_ws.write("F3", "تاريخ الاستلام", meta_format)
-                        invoice_ws.write("F4", "امر شراء رقم", meta_format)
-                        invoice_ws.write("F6", "اسم العميل", meta_format)
-                        invoice_ws.write("F7", "الفرع", meta_format)
-
-                        invoice_ws.write("E2", invoice_number, meta_format)
-                        invoice_ws.write("E3", delivery_date, meta_format)
-                        invoice_ws.write("E4", str(order_number), meta_format)
-                        invoice_ws.write("E6", f"{prefix} - فرع {branch}", meta_format)
-                        invoice_ws.write("E7", branch, meta_format)
-
-                        invoice_ws.write("A11", "Barcode", headers_format)
-                        invoice_ws.write("B11", "Arabic Product Name", headers_format)
-                        invoice_ws.write("C11", "Unit Cost", headers_format)
-                        invoice_ws.write("D11", "quantity", headers_format)
-                        invoice_ws.write("E11", "total", headers_format)
-
-                        for idx, row in df.iterrows():
-                            row_num = 11 + idx
-                            barcode_value = row.get("Barcode", "")
-                            if pd.isna(barcode_value) or barcode_value == '':
-                                invoice_ws.write_blank(row_num, 0, "", border_format)
-                            else:
-                                try:
-                                    barcode_int = int(barcode_value)
-                                    invoice_ws.write_number(row_num, 0, barcode_int, barcode_format)
-                                except:
-                                    invoice_ws.write_string(row_num, 0, str(barcode_value), border_format)
-
-                            invoice_ws.write(row_num, 1, row.get("Arabic Product Name", ""), border_format)
-                            invoice_ws.write(row_num, 2, row.get("Unit Cost", ""), border_format)
-                            invoice_ws.write(row_num, 3, "", qty_total_format)
-                            invoice_ws.write(row_num, 4, "", qty_total_format)
-
-                        last_row = 11 + len(df)
-                        invoice_ws.merge_range(last_row, 0, last_row, 3, "Subtotal", bold_merge)
-                        invoice_ws.write_blank(last_row, 4, "", bold_border_right)
-                        invoice_ws.merge_range(last_row + 1, 0, last_row + 1, 3, "Total", bold_merge)
-                        invoice_ws.write(last_row + 1, 4, invoice_total, bold_border_right)
-
-                        for i, text in enumerate(["شركة خضار للتجارة و التسويق", "ش.ذ.م.م", "سجل تجارى / 13138  بطاقه ضريبية/721/294/448"]):
-                            row = last_row + 3 + i
-                            invoice_ws.merge_range(row, 0, row, 3, text, bold_center)
-
-                        invoice_ws.set_column("A:A", 25)
-                        invoice_ws.set_column("B:B", 30)
-                        invoice_ws.set_column("C:E", 15)
-
-                    excel_buffer.seek(0)
-                    invoice_zip.writestr(output_filename, excel_buffer.getvalue())
-
-                    pivot_cols = ["SKU", "Barcode", "Arabic Product Name", "Unit Cost", "Total PC"]
-                    if all(col in df.columns for col in pivot_cols):
-                        pivot_df = df[pivot_cols].copy()
-                        pivot_df.rename(columns={"Total PC": branch}, inplace=True)
-                        if "khateer" in name_lc.lower():
-                            khateer_data.append(pivot_df)
-                        else:
-                            khodar_data.append(pivot_df)
+                    renders.append({
+                        "file_name": file_name,
+                        "output_filename": output_filename,
+                        "args": (df, invoice_number, delivery_date, order_number, prefix, branch, invoice_total),
+                        "df": df,
+                        "branch": branch,
+                        "khateer": "khateer" in name_lc.lower(),
+                    })
 
                 except Exception as e:
-                    error_txt = f"Failed to process {file_name}: {str(e)}"
-                    output_zip.writestr(f"errors/Error_{file_name}.txt", error_txt)
-
-        def create_aggregated_df(list_of_dfs):
-            if not list_of_dfs:
+                    renders.append({"file_name": file_name, "error": e})
+
+        # Render the invoices (in parallel for large orders), then file them in input order
+        rendered = [item for item in renders if "error" not in item]
+        excel_files = render_all(render_rabbit_invoice, [item["args"] for item in rendered], return_exceptions=True)
+        for item, result in zip(rendered, excel_files):
+            item["error" if isinstance(result, Exception) else "xlsx"] = result
+
+        for client in ("rabbit", "khateer"):
+            record_line_items(
+                client, delivery_date,
+                [(item["branch"], item["args"][3], item["args"][1], item["df"])
+                 for item in renders if "xlsx" in item and item["khateer"] == (client == "khateer")],
+                {"sku": "SKU", "barcode": "Barcode", "product_name": "Arabic Product Name", "qty": "Total PC", "unit_price": "Unit Cost"}
+            )
+            register_invoices(client, delivery_date, [
+                (item["args"][1], item["args"][3], item["branch"], item["output_filename"], item["xlsx"])
+                for item in renders if "xlsx" in item and item["khateer"] == (client == "khateer")
+            ])
+
+        for item in renders:
+            if "error" in item:
+                error_txt = f"Failed to process {item['file_name']}: {str(item['error'])}"
+                output_zip.writestr(f"errors/Error_{item['file_name']}.txt", error_txt)
+
+        # invoices.zip is written straight into the output archive
+        with nested_archive(output_zip, "invoices.zip") as invoice_zip:
+            for item in renders:
+                if "xlsx" in item:
+                    add_member(invoice_zip, item["output_filename"], item["xlsx"])
+
+        for item in renders:
+            if "xlsx" not in item:
+                continue
+            df, branch = item["df"], item["branch"]
+            pivot_cols = ["SKU", "Barcode", "Arabic Product Name", "Unit Cost", "Total PC"]
+            if all(col in df.columns for col in pivot_cols):
+                branch_data = khateer_data if item["khateer"] else khodar_data
+                pivot_df = df[pivot_cols]
+                if branch in branch_data:
+                    # a second file for the same branch adds to its quantities
+                    pivot_df = pd.concat([branch_data[branch], pivot_df], ignore_index=True)
+                branch_data[branch] = pivot_df
+
+        def create_aggregated_df(branch_frames):
+            if not branch_frames:
                 return None
-            merged_df = list_of_dfs[0]
-            for df in list_of_dfs[1:]:
-                merged_df = pd.merge(merged_df, df, on=["SKU", "Barcode", "Arabic Product Name", "Unit Cost"], how="outer")
+            merged_df = pivot_branches(branch_frames, ["SKU", "Barcode", "Arabic Product Name", "Unit Cost"], {"Total PC": "{branch}"})
             branch_cols = sorted([col for col in merged_df.columns if col not in ["SKU", "Barcode", "Arabic Product Name", "Unit Cost"]])
             merged_df[branch_cols] = merged_df[branch_cols].fillna(0)
             merged_df["Total Quantity"] = merged_df[branch_cols].sum(axis=1)
@@ -181,25 +184,18 @@ def rabbitInvoices(zip_bytes: bytes, base_invoice_num: int, delivery_date: str,
         khateer_pivot = create_aggregated_df(khateer_data)
         khodar_pivot = create_aggregated_df(khodar_data)
 
-        invoice_zip.close()
-        output_zip.writestr("invoices.zip", invoice_zip_buffer.getvalue())
-
         if khateer_pivot is not None:
-            khateer_buffer = io.BytesIO()
-            khateer_pivot.to_excel(khateer_buffer, index=False)
-            output_zip.writestr(f"مجمع خطير_{delivery_date}.xlsx", khateer_buffer.getvalue())
+            add_member(output_zip, f"مجمع خطير_{delivery_date}.xlsx", write_frame(khateer_pivot))
 
         if khodar_pivot is not None:
-            khodar_buffer = io.BytesIO()
-            khodar_pivot.to_excel(khodar_buffer, index=False)
-            output_zip.writestr(f"مجمع رابيت_{delivery_date}.xlsx", khodar_buffer.getvalue())
+            add_member(output_zip, f"مجمع رابيت_{delivery_date}.xlsx", write_frame(khodar_pivot))
 
         if po_totals_rows:
             po_totals_df = pd.DataFrame(po_totals_rows)
             po_totals_df["Invoice Total"] = pd.to_numeric(po_totals_df["Invoice Total"], errors="coerce")
             po_totals_buffer = io.BytesIO()
             po_totals_df.to_excel(po_totals_buffer, index=False)
-            output_zip.writestr(f"po_totals_{delivery_date}.xlsx", po_totals_buffer.getvalue())
+            add_member(output_zip, f"po_totals_{delivery_date}.xlsx", po_totals_buffer.getbuffer())
 
     output_zip_io.seek(0)
     return output_zip_io.getvalue(), file_index
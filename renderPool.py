@@ -0,0 +1,95 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Branch workbooks of one order are independent once their invoice numbers are fixed, so
+# they are rendered in a pool of worker processes and gathered back in job order, which
+# keeps ZIP contents deterministic. The pool is started on first use and kept for the
+# life of the process; orders smaller than KHODAR_RENDER_MIN_JOBS (or a single worker)
+# render serially, where starting and feeding the pool costs more than it saves.
+#
+# Workers are started by a fork server (spawned where there is none, e.g. Windows), not
+# forked from the caller: the portal runs inside the multithreaded Streamlit server, and a
+# child forked while another thread holds a lock (logging, allocator, an HTTP pool) can
+# hang on it forever. The fork server preloads the render modules, so each worker starts
+# with them imported. Both methods import the entry script again in every worker under
+# the name __mp_main__; the Streamlit CLI and automategeneration only do work under their
+# __main__ guard. The default pool is capped at RENDER_MAX_WORKERS, since each worker holds
+# its own copy of pandas and openpyxl; set KHODAR_RENDER_WORKERS to size it explicitly.
+RENDER_MAX_WORKERS = 4
+RENDER_WORKERS = int(os.environ.get("KHODAR_RENDER_WORKERS", min(os.cpu_count() or 1, RENDER_MAX_WORKERS)))
+RENDER_MIN_JOBS = int(os.environ.get("KHODAR_RENDER_MIN_JOBS", 8))
+RENDER_START_METHOD = os.environ.get(
+    "KHODAR_RENDER_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+_PRELOAD = ["pdfsToExcels", "rabbitInvoices", "breadfastInvoices"]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(RENDER_START_METHOD)
+            if RENDER_START_METHOD == "forkserver":
+                context.set_forkserver_preload(_PRELOAD)
+            _pool = ProcessPoolExecutor(RENDER_WORKERS, mp_context=context)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _call(render, args, return_exceptions):
+    try:
+        return render(*args)
+    except Exception as e:
+        if not return_exceptions:
+            raise
+        return e
+
+
+def render_all(render, jobs: list, return_exceptions: bool = False) -> list:
+    """
+    [render(*job) for job in jobs], in job order, on the worker pool when the order is
+    large enough. `render` must be a module-level function and the jobs picklable.
+    Args:
+        return_exceptions: put a failed job's exception in its place instead of raising
+    """
+    jobs = list(jobs)
+    if RENDER_WORKERS <= 1 or len(jobs) < max(RENDER_MIN_JOBS, 2):
+        return [_call(render, args, return_exceptions) for args in jobs]
+
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(render, *args) for args in jobs]
+    except (BrokenProcessPool, RuntimeError, OSError) as e:
+        print(f"Render pool unavailable ({e}); rendering {len(jobs)} workbooks serially")
+        _reset_pool()
+        return [_call(render, args, return_exceptions) for args in jobs]
+
+    results = []
+    for future, args in zip(futures, jobs):
+        try:
+            results.append(future.result())
+        except BrokenProcessPool as e:
+            # a worker died (e.g. out of memory): finish the rest here and start over next time
+            print(f"Render pool failed ({e}); rendering the remaining workbooks serially")
+            _reset_pool()
+            results.extend(_call(render, args, return_exceptions) for args in jobs[len(results):])
+            break
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
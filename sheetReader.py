@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import zipfile
+from io import BytesIO
+from datetime import date, time as dt_time, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Uploaded client workbooks are parsed once into the cell grid pandas.read_excel would
+# build (blanks as "", whole floats as ints, trailing empty rows and cells trimmed) and
+# every frame a converter needs is cut from that grid, instead of calling read_excel once
+# per header layout. "calamine" (the optional python-calamine package, compiled) is much
+# faster than openpyxl but reads whitespace-only cells as blank, so a trailing row or
+# column holding only spaces is trimmed away and positional lookups such as Rabbit's
+# iloc[-9, -1] shift. openpyxl is therefore the default; "calamine", or "auto" (calamine
+# when installed), is opt-in through KHODAR_EXCEL_READER. Check a reader against real
+# uploads with `python sheetReader.py <xlsx or zip>...` before switching.
+EXCEL_READER = os.environ.get("KHODAR_EXCEL_READER", "openpyxl")
+
+
+def excel_reader(reader: str = None) -> str:
+    reader = reader or EXCEL_READER
+    if reader == "auto":
+        return "calamine" if CalamineWorkbook is not None else "openpyxl"
+    if reader not in ("openpyxl", "calamine"):
+        raise ValueError(f"Unknown Excel reader: {reader}")
+    if reader == "calamine" and CalamineWorkbook is None:
+        raise ValueError("Excel reader 'calamine' needs the python-calamine package")
+    return reader
+
+
+def _openpyxl_cell(cell):
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        whole = int(cell.value)
+        return whole if whole == cell.value else float(cell.value)
+    return cell.value
+
+
+def _calamine_cell(value):
+    if isinstance(value, float):
+        whole = int(value)
+        return whole if whole == value else value
+    if isinstance(value, dt_time):
+        return value
+    if isinstance(value, date):
+        return pd.Timestamp(value)
+    if isinstance(value, timedelta):
+        return pd.Timedelta(value)
+    return value
+
+
+def _trimmed(rows) -> list:
+    # drop trailing blank cells and rows, then pad every row to the widest one
+    data = []
+    last_row_with_data = -1
+    for row_number, row in enumerate(rows):
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_row_with_data = row_number
+        data.append(row)
+    data = data[:last_row_with_data + 1]
+    if data:
+        width = max(len(row) for row in data)
+        data = [row + [""] * (width - len(row)) for row in data]
+    return data
+
+
+def read_sheets(source, reader: str = None) -> dict:
+    """
+    {sheet name: cell grid} for every worksheet of `source` (bytes or a binary file),
+    in workbook order, read in a single pass.
+    """
+    reader = excel_reader(reader)
+    data = source if isinstance(source, bytes) else source.read()
+    sheets = {}
+    if reader == "calamine":
+        workbook = CalamineWorkbook.from_filelike(BytesIO(data))
+        for name in workbook.sheet_names:
+            rows = workbook.get_sheet_by_name(name).to_python(skip_empty_area=False)
+            sheets[name] = _trimmed([[_calamine_cell(value) for value in row] for row in rows])
+        return sheets
+
+    workbook = load_workbook(BytesIO(data), read_only=True, data_only=True, keep_links=False)
+    try:
+        for worksheet in workbook.worksheets:
+            worksheet.reset_dimensions()
+            sheets[worksheet.title] = _trimmed([[_openpyxl_cell(cell) for cell in row] for row in worksheet.rows])
+    finally:
+        workbook.close()
+    return sheets
+
+
+def read_sheet(source, reader: str = None) -> list:
+    """Cell grid of the first worksheet."""
+    return next(iter(read_sheets(source, reader).values()), [])
+
+
+def grid_frame(grid: list, skiprows: int = None, **kwargs) -> pd.DataFrame:
+    """pd.read_excel(..., skiprows=skiprows, **kwargs) of an already-read cell grid."""
+    if not grid:
+        return pd.DataFrame()
+    rows = [list(row) for row in grid]  # the parser fills blanks in place
+    return TextParser(rows, header=0, skiprows=skiprows, skip_blank_lines=False, **kwargs).read()
+
+
+def benchmark_readers(paths: list) -> None:
+    """Times read_excel twice per workbook (the old Rabbit read) against one grid read."""
+    members = []
+    for path in paths:
+        if path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                members += [archive.read(n) for n in archive.namelist() if n.lower().endswith(".xlsx")]
+        else:
+            with open(path, "rb") as f:
+                members.append(f.read())
+
+    start = time.perf_counter()
+    for data in members:
+        pd.read_excel(BytesIO(data), skiprows=8)
+        pd.read_excel(BytesIO(data))
+    print(f"read_excel x2: {(time.perf_counter() - start) * 1000:.0f} ms for {len(members)} workbooks")
+
+    readers = ["openpyxl"] + (["calamine"] if CalamineWorkbook is not None else [])
+    for reader in readers:
+        start = time.perf_counter()
+        for data in members:
+            grid = read_sheet(data, reader)
+            grid_frame(grid, skiprows=8)
+            grid_frame(grid)
+        print(f"{reader} grid: {(time.perf_counter() - start) * 1000:.0f} ms for {len(members)} workbooks")
+
+
+if __name__ == "__main__":
+    # Usage: python sheetReader.py <xlsx or zip>...
+    benchmark_readers(sys.argv[1:])
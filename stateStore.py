@@ -0,0 +1,189 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+
+import requests
+
+from config import SUPABASE_URL, API_KEY, AUTHORIZATION
+import lineItemHistory
+import invoiceRegistry
+
+# The local SQLite stores (line-item history, invoice registry) live next to the code,
+# which on the hourly GitHub Actions runner is a fresh checkout every time. They are
+# therefore kept in Supabase storage as well: a run pulls each store before converting and
+# pushes it back afterwards. Pulling merges the shared copy into the local file; pushing
+# merges the local file into the latest shared copy and uploads the result, so the worker
+# and the portal can run at the same time without dropping each other's records. Per key
+# (one PO's lines, one invoice workbook) the copy with the newer timestamp wins. Only a
+# push that lands between another writer's download and upload (seconds apart) can still
+# lose that writer's newest rows; they come back with its next run of the same orders.
+#
+# The stores hold every client's prices, quantities, PO and invoice numbers, so they go
+# only to the bucket named in KHODAR_STATE_BUCKET, which must be private (never the public
+# order bucket). Without it nothing is pulled or pushed and each run keeps its local
+# stores, as before. A failed pull or push is printed and the run goes on with the local
+# store.
+STATE_BUCKET = os.environ.get("KHODAR_STATE_BUCKET", "")
+STATE_PREFIX = os.environ.get("KHODAR_STATE_PREFIX", "_state")
+
+_pulled_at = {}  # local path -> time of its last pull
+_told_local = False
+
+
+def stores() -> list:
+    """(local path, table, key columns, timestamp column) of every shared store."""
+    return [
+        (lineItemHistory.HISTORY_PATH, lineItemHistory.STORE_TABLE,
+         lineItemHistory.STORE_KEY, lineItemHistory.STORE_STAMP),
+        (invoiceRegistry.REGISTRY_PATH, invoiceRegistry.STORE_TABLE,
+         invoiceRegistry.STORE_KEY, invoiceRegistry.STORE_STAMP),
+    ]
+
+
+def _object_url(path: str) -> str:
+    return f"{SUPABASE_URL}/storage/v1/object/{STATE_BUCKET}/{STATE_PREFIX}/{os.path.basename(path)}"
+
+
+def download_store(path: str):
+    """The shared copy of the store at `path`, or None when there is none yet."""
+    resp = requests.get(_object_url(path), headers={"apikey": API_KEY, "authorization": AUTHORIZATION}, timeout=60)
+    # storage answers a missing object with 400 {"error": "not_found"} as well as 404
+    if resp.status_code == 404 or (resp.status_code == 400 and "not_found" in resp.text):
+        return None
+    resp.raise_for_status()
+    return resp.content
+
+
+def upload_store(path: str, data: bytes) -> None:
+    resp = requests.post(
+        _object_url(path),
+        headers={"apikey": API_KEY, "authorization": AUTHORIZATION, "x-upsert": "true"},
+        files={"file": (os.path.basename(path), data, "application/octet-stream")},
+        timeout=60
+    )
+    resp.raise_for_status()
+
+
+def _columns(connection: sqlite3.Connection, schema: str, table: str) -> list:
+    return [row[1] for row in connection.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def merge_store(source: str, target: str, table: str, key, stamp: str) -> int:
+    """
+    Copies the rows of `source` into `target` for every key that `target` lacks or holds
+    with an older `stamp`; returns the number of rows copied.
+    """
+    keys = ", ".join(key)
+    same_key = " AND ".join(f"n.{k} IS t.{k}" for k in key)
+    with closing(sqlite3.connect(target, timeout=30)) as connection:
+        connection.execute("ATTACH DATABASE ? AS src", (source,))
+        target_columns = _columns(connection, "main", table)
+        columns = ", ".join(c for c in _columns(connection, "src", table) if c in target_columns)
+        with connection:
+            # decided per key on a few thousand (key, newest stamp) rows rather than per line
+            for schema in ("main", "src"):
+                connection.execute(f"DROP TABLE IF EXISTS temp.{schema}_keys")
+                connection.execute(
+                    f"CREATE TEMP TABLE {schema}_keys AS SELECT {keys}, MAX({stamp}) AS stamp "
+                    f"FROM {schema}.{table} GROUP BY {keys}"
+                )
+            connection.execute("DROP TABLE IF EXISTS temp.newer")
+            connection.execute(
+                f"CREATE TEMP TABLE newer AS SELECT * FROM temp.src_keys AS n WHERE NOT EXISTS "
+                f"(SELECT 1 FROM temp.main_keys AS t WHERE {same_key} AND COALESCE(t.stamp, '') >= COALESCE(n.stamp, ''))"
+            )
+            connection.execute(
+                f"DELETE FROM main.{table} WHERE rowid IN "
+                f"(SELECT t.rowid FROM temp.newer AS n JOIN main.{table} AS t ON {same_key})"
+            )
+            copied = connection.execute(
+                f"INSERT INTO main.{table} ({columns}) SELECT {', '.join(f't.{c}' for c in columns.split(', '))} "
+                f"FROM temp.newer AS n JOIN src.{table} AS t ON {same_key}"
+            ).rowcount
+    return copied
+
+
+def pull_store(path: str, table: str, key, stamp: str) -> bool:
+    """Merges the shared copy into the local store; True when there was one."""
+    if not path or not STATE_BUCKET:
+        return False
+    name = os.path.basename(path)
+    try:
+        data = download_store(path)
+        if data is None:
+            return False
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shared = os.path.join(tmp_dir, name)
+            with open(shared, "wb") as f:
+                f.write(data)
+            if os.path.exists(path):
+                copied = merge_store(shared, path, table, key, stamp)
+            else:
+                os.replace(shared, path)
+                copied = "all"
+        print(f"Pulled {name}: {copied} rows")
+        return True
+    except Exception as e:
+        print(f"Could not pull {name} from shared storage ({e!r}); using the local copy")
+        return False
+
+
+def push_store(path: str, table: str, key, stamp: str) -> bool:
+    """Merges the local store into the shared copy and uploads it; True when uploaded."""
+    if not path or not STATE_BUCKET or not os.path.exists(path):
+        return False
+    name = os.path.basename(path)
+    try:
+        data = download_store(path)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            merged = os.path.join(tmp_dir, name)
+            if data is None:
+                # a consistent copy, including what is still in the local WAL file
+                with closing(sqlite3.connect(path, timeout=30)) as local, closing(sqlite3.connect(merged)) as copy:
+                    local.backup(copy)
+            else:
+                with open(merged, "wb") as f:
+                    f.write(data)
+                merge_store(path, merged, table, key, stamp)
+            with closing(sqlite3.connect(merged)) as connection:
+                # one self-contained file to upload
+                connection.execute("PRAGMA journal_mode=DELETE")
+            with open(merged, "rb") as f:
+                upload_store(path, f.read())
+        return True
+    except Exception as e:
+        print(f"Could not push {name} to shared storage: {e!r}")
+        return False
+
+
+def pull_stores(paths: list = None, max_age: float = 0) -> None:
+    """Pulls every shared store (or those at `paths`) not pulled in the last `max_age` seconds."""
+    global _told_local
+    if not STATE_BUCKET:
+        if not _told_local:
+            _told_local = True
+            print("KHODAR_STATE_BUCKET is not set; the history and invoice registry stay local")
+        return
+    for store in stores():
+        path = store[0]
+        if (paths is None or path in paths) and time.time() - _pulled_at.get(path, 0) >= max_age:
+            _pulled_at[path] = time.time()
+            pull_store(*store)
+
+
+def push_stores() -> None:
+    for store in stores():
+        push_store(*store)
+
+
+if __name__ == "__main__":
+    # Usage: python stateStore.py pull|push
+    if sys.argv[1:2] == ["pull"]:
+        pull_stores()
+    elif sys.argv[1:2] == ["push"]:
+        push_stores()
+    else:
+        print("Usage: python stateStore.py pull|push")
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# the modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the stores are configured at import time; keep test runs from writing next to the code
+# (tests that exercise a store pass it an explicit path)
+os.environ.setdefault("KHODAR_HISTORY_PATH", "")
+os.environ.setdefault("KHODAR_INVOICE_REGISTRY_PATH", "")
+os.environ.setdefault("KHODAR_PARSE_CACHE_DIR", tempfile.mkdtemp(prefix="khodar-parse-cache-"))
@@ -0,0 +1,100 @@
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import pivot_branches
+
+KEYS = ["SKU", "Barcode", "Unit Cost"]
+
+
+def merge_branches(frames: dict, keys: list, values: dict) -> pd.DataFrame:
+    # the chained outer merge the Rabbit and Halan summaries used before pivot_branches
+    renamed = [
+        df[keys + list(values)].rename(columns={value: name.format(branch=branch) for value, name in values.items()})
+        for branch, df in frames.items()
+    ]
+    return reduce(lambda a, b: pd.merge(a, b, on=keys, how="outer"), renamed)
+
+
+def _frames(count: int, products: int = 60, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for b in range(count):
+        ids = np.sort(rng.choice(products * 2, products, replace=False))
+        frames[f"فرع {b}"] = pd.DataFrame({
+            "SKU": ids,
+            "Barcode": 6220000000000 + ids,
+            "Unit Cost": (ids % 40) * 0.5,
+            "qty": rng.integers(1, 9, products),
+            "price": (ids % 7) + 0.25,
+        })
+    return frames
+
+
+@pytest.mark.parametrize("count", [2, 5, 25, 100])
+def test_pivot_matches_the_chained_outer_merge(count):
+    frames = _frames(count)
+    values = {"qty": "{branch}", "price": "price_{branch}"}
+    merged = merge_branches(frames, KEYS, values).reset_index(drop=True)
+    pivoted = pivot_branches(frames, KEYS, values)
+    assert list(pivoted.columns) == list(merged.columns)
+    pd.testing.assert_frame_equal(pivoted.astype(float), merged.astype(float))
+
+
+def test_missing_keys_match_like_any_other_value():
+    frames = {
+        "a": pd.DataFrame({"Barcode": [1.0, np.nan], "Product name": ["x", "y"], "qty": [1, 2]}),
+        "b": pd.DataFrame({"Barcode": [np.nan, 3.0], "Product name": ["y", "z"], "qty": [5, 6]}),
+    }
+    keys = ["Barcode", "Product name"]
+    merged = merge_branches(frames, keys, {"qty": "{branch}"})
+    pivoted = pivot_branches(frames, keys, {"qty": "{branch}"})
+    pd.testing.assert_frame_equal(
+        pivoted.sort_values(keys).reset_index(drop=True).astype({"a": float, "b": float}),
+        merged.sort_values(keys).reset_index(drop=True).astype({"a": float, "b": float}),
+    )
+
+
+def test_single_branch_keeps_its_row_order():
+    frame = pd.DataFrame({"SKU": [3, 1, 2], "Barcode": [30, 10, 20], "Unit Cost": [1.0, 2.0, 3.0], "qty": [7, 8, 9]})
+    pivoted = pivot_branches({"فرع": frame}, KEYS, {"qty": "{branch}"})
+    assert pivoted["SKU"].tolist() == [3, 1, 2]
+    assert pivoted["فرع"].tolist() == [7.0, 8.0, 9.0]
+
+
+def test_a_key_repeated_in_one_branch_is_summed():
+    frames = {
+        "a": pd.DataFrame({"SKU": [1, 1, 2], "Barcode": [10, 10, 20], "Unit Cost": [1.0, 1.0, 2.0], "qty": [2, 3, 4]}),
+        "b": pd.DataFrame({"SKU": [2], "Barcode": [20], "Unit Cost": [2.0], "qty": [1]}),
+    }
+    pivoted = pivot_branches(frames, KEYS, {"qty": "{branch}"})
+    assert pivoted["a"].tolist() == [5.0, 4.0]
+    assert pivoted["b"].isna().tolist() == [True, False]
+
+
+@pytest.mark.parametrize("price_how, price", [("max", 10.0), ("first", 10.0)])
+def test_a_repeated_key_sums_qty_but_not_price(price_how, price):
+    frames = {
+        "a": pd.DataFrame({"Barcode": [10, 10, 20], "qty": [2, 3, 4], "price": [10.0, 10.0, 7.5]}),
+        "b": pd.DataFrame({"Barcode": [20], "qty": [1], "price": [7.5]}),
+    }
+    values = {"qty": "{branch}", "price": "price_{branch}"}
+    pivoted = pivot_branches(frames, ["Barcode"], values, how={"qty": "sum", "price": price_how})
+    assert pivoted["a"].tolist() == [5.0, 4.0]
+    assert pivoted["price_a"].tolist() == [price, 7.5]
+    assert pivoted["b"].isna().tolist() == [True, False]
+    assert pivoted["price_b"].fillna(0).tolist() == [0.0, 7.5]
+    # what the Halan summary bills: total qty times price, not the summed price
+    assert (pivoted["a"] * pivoted["price_a"]).sum() == 5 * 10.0 + 4 * 7.5
+
+
+def test_a_repeated_price_with_differing_values_takes_the_largest():
+    frames = {"a": pd.DataFrame({"Barcode": [10, 10], "qty": [2, 3], "price": [9.0, 10.0]})}
+    pivoted = pivot_branches(frames, ["Barcode"], {"qty": "{branch}", "price": "price_{branch}"}, how={"price": "max"})
+    assert pivoted[["a", "price_a"]].values.tolist() == [[5.0, 10.0]]
+
+
+def test_no_branches_gives_an_empty_frame():
+    assert list(pivot_branches({}, KEYS, {"qty": "{branch}"}).columns) == KEYS
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from branchRegistry import (
+    branch_misses, normalize_branch, register_branches, report_branch_misses, reset_branch_misses, resolve_branch
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_run():
+    register_branches("test", {"مدينة نصر": "Nasr City", "حدائق الأهرام": "Hadayek", "فرع ٢": "Branch 2"})
+    reset_branch_misses()
+    yield
+    reset_branch_misses()
+
+
+@pytest.mark.parametrize("spelling, canonical", [
+    ("مدينه نصر", "مدينة نصر"),
+    ("  مدينة   نصر ", "مدينة نصر"),
+    ("حدائق الاهرام", "حدائق الأهرام"),
+    ("حدائـــق الأهرام", "حدائق الأهرام"),
+    ("فرع 2", "فرع ٢"),
+    ("Branch", "branch"),
+])
+def test_spellings_normalize_together(spelling, canonical):
+    assert normalize_branch(spelling) == normalize_branch(canonical)
+
+
+def test_resolve_folds_spellings_and_counts_misses():
+    assert resolve_branch("test", "مدينه نصر") == "Nasr City"
+    assert resolve_branch("test", "فرع 2") == "Branch 2"
+    assert resolve_branch("test", " المعادي ") == "المعادي"
+    assert resolve_branch("test", " المعادي ", default="?") == "?"
+    assert branch_misses("test") == {("test", " المعادي "): 2}
+
+
+def test_misses_belong_to_the_run_that_produced_them():
+    resolve_branch("test", "الدقي")
+    assert "الدقي" in report_branch_misses()
+    reset_branch_misses()
+    assert report_branch_misses() == ""
+    resolve_branch("test", "شبرا")
+    assert branch_misses() == {("test", "شبرا"): 1}
+
+
+def test_concurrent_runs_report_only_their_own_misses():
+    reports = {}
+
+    def run(name):
+        reset_branch_misses()
+        resolve_branch("test", name)
+        reports[name] = branch_misses()
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ("الدقي", "شبرا")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert reports == {"الدقي": {("test", "الدقي"): 1}, "شبرا": {("test", "شبرا"): 1}}
+    assert branch_misses() == {}
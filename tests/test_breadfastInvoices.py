@@ -0,0 +1,56 @@
+import pandas as pd
+
+from breadfastInvoices import parse_line_items, tokenize_line_items
+
+BAG = "5513135413135435131543"  # the packaging ID, printed without a barcode
+
+
+def _line(item_id, name, barcode, qty, price):
+    barcode = f" {barcode}" if barcode else ""
+    return f"[{item_id}] {name}{barcode} {qty}.0000000 Units {price:.6f} {qty * price:.2f}\n"
+
+
+def test_a_packaging_id_without_a_barcode_gets_an_empty_one():
+    text = (
+        "Purchase Order #P10231\n"
+        + _line(6484932, "Tomato", "2210000000013", 3, 12.5)
+        + _line(BAG, "Packing bag", None, 2, 3.25)
+        + _line(6484870, "Cucumber", "2210000000020", 4, 13.5)
+    )
+    assert tokenize_line_items(text) == [
+        ["6484932", "2210000000013", "3", "12.500000"],
+        [BAG, "", "2", "3.250000"],
+        ["6484870", "2210000000020", "4", "13.500000"],
+    ]
+
+
+def test_numeric_header_tokens_before_the_first_item_are_ignored():
+    text = (
+        "Purchase Order #P10231 Vendor 2219999999999 \n"
+        "Order total 9.0000000 Units 100.000000 EGP\n"
+        + _line(6484932, "Tomato", "2210000000013", 3, 12.5)
+    )
+    assert tokenize_line_items(text) == [["6484932", "2210000000013", "3", "12.500000"]]
+
+
+def test_the_same_barcodeless_id_twice_gives_two_rows():
+    text = (
+        _line(BAG, "Packing bag", None, 2, 3.25)
+        + _line(6484932, "Tomato", "2210000000013", 3, 12.5)
+        + _line(BAG, "Packing bag", None, 5, 3.25)
+    )
+    items = parse_line_items(text)
+    pd.testing.assert_frame_equal(items, pd.DataFrame({
+        "ID": pd.Series([BAG, "6484932", BAG], dtype=str),
+        "Barcode": pd.Series(["", "2210000000013", ""], dtype=str),
+        "Quantity": pd.Series([2, 3, 5], dtype="int64"),
+        "pp": pd.Series([3.25, 12.5, 3.25], dtype="float64"),
+    }))
+
+
+def test_an_item_missing_quantity_and_price():
+    text = "[6484932] Tomato 2210000000013 Units\n" + _line(6484870, "Cucumber", "2210000000020", 4, 13.5)
+    items = parse_line_items(text)
+    assert items["Quantity"].tolist() == [0, 4]
+    assert items["pp"].isna().tolist() == [True, False]
+    assert items["Barcode"].tolist() == ["2210000000013", "2210000000020"]
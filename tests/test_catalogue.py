@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import catalogue
+from catalogue import categories_for, products_by_sku, sort_by_category
+
+
+def categories_rowwise(df: pd.DataFrame, default=None) -> pd.Series:
+    # the row-by-row apply GoodsMart and Breadfast used before categories_for
+    current = catalogue.catalogue()
+    barcode_to_product = current["barcode_to_product"]
+    product_to_category = current["product_to_category"]
+
+    def get_category(row):
+        barcode = str(row.get("Barcode", "")).strip()
+        prod_name = str(row.get("Product Name", "")).strip()
+        product_from_barcode = barcode_to_product.get(barcode, "").strip()
+        if product_from_barcode and product_from_barcode in product_to_category:
+            return product_to_category[product_from_barcode]
+        if prod_name in product_to_category:
+            return product_to_category[prod_name]
+        return default
+
+    return df.apply(get_category, axis=1)
+
+
+def _export(rows: int = 5000) -> pd.DataFrame:
+    # a GoodsMart-like export: known and unknown barcodes and names, stray spaces, blanks
+    current = catalogue.catalogue()
+    rng = np.random.default_rng(0)
+    barcodes = list(current["barcode_to_product"]) + ["6220000000000", "nan", ""]
+    names = list(current["product_to_category"]) + ["منتج جديد", " طماطم "]
+    return pd.DataFrame({
+        "Barcode": [f" {b}" if i % 7 == 0 else b for i, b in enumerate(rng.choice(barcodes, rows))],
+        "Product Name": rng.choice(names, rows),
+    })
+
+
+@pytest.mark.parametrize("default", ["غير مصنف", None])
+def test_categories_for_matches_the_rowwise_apply(default):
+    df = _export()
+    expected = categories_rowwise(df, default)
+    mapped = categories_for(df["Product Name"], df["Barcode"], default)
+    if default is None:
+        # apply returns None for unknown rows, map returns NaN
+        expected = expected.fillna(np.nan)
+    pd.testing.assert_series_equal(mapped, expected, check_dtype=False, check_names=False)
+
+
+def test_categories_for_names_only():
+    names = pd.Series(list(catalogue.catalogue()["product_to_category"])[:3] + ["منتج جديد"])
+    categories = categories_for(names, default="غير مصنف")
+    assert categories.iloc[-1] == "غير مصنف"
+    assert set(categories.iloc[:3]) <= set(catalogue.CATEGORY_ORDER)
+
+
+def test_sort_by_category_uses_category_order_then_fallback_then_the_rest():
+    df = pd.DataFrame({
+        "category": ["اعشاب", "غير مصنف", "خضار", "فاكهه", "أخرى", "خضار"],
+        "name": ["نعناع", "س", "كوسة", "تفاح", "ص", "بطاطس"],
+    })
+    ordered = sort_by_category(df, "category", "name", fallback="غير مصنف")
+    assert ordered["name"].tolist() == ["تفاح", "بطاطس", "كوسة", "نعناع", "س", "ص"]
+
+
+def test_products_by_sku():
+    sku, product = next(iter(catalogue.catalogue()["translation_dict"].items()))
+    names = products_by_sku([sku, -1])
+    assert names[0] == product and pd.isna(names[1])
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "catalogue.json")
+    shutil.copy(catalogue.CATALOGUE_PATH, path)
+    yield path
+    catalogue.reload()
+
+
+def _rewrite(path, change):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    change(data)
+    stat = os.stat(path)
+    catalogue.save_catalogue(data, path)
+    # a new mtime even on filesystems with coarse timestamps
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_catalogue_is_cached_until_the_file_changes(snapshot):
+    first = catalogue.catalogue(snapshot)
+    assert catalogue.catalogue(snapshot) is first
+
+    _rewrite(snapshot, lambda data: data["barcode_to_product"].update({"6220000000000": "منتج جديد"}))
+    second = catalogue.catalogue(snapshot)
+    assert second is not first
+    assert second["barcode_to_product"]["6220000000000"] == "منتج جديد"
+
+
+def test_a_broken_file_keeps_the_previous_catalogue(snapshot, capsys):
+    first = catalogue.catalogue(snapshot)
+    with open(snapshot, "a", encoding="utf-8") as f:
+        f.write("{ not json")
+    assert catalogue.catalogue(snapshot) is first
+    assert "keeping the previous one" in capsys.readouterr().out
+
+
+def test_save_refuses_a_catalogue_that_would_not_load(snapshot):
+    with pytest.raises(ValueError, match="Unsupported catalogue version"):
+        catalogue.save_catalogue({"version": 0}, snapshot)
@@ -0,0 +1,122 @@
+import json
+import shutil
+
+import pytest
+
+import catalogue
+import catalogueSync
+
+
+class PostgREST:
+    """The catalogue table behind a PostgREST endpoint: Range paging, max-rows, ETags."""
+
+    def __init__(self, rows, max_rows=1000, lose_after=None):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.lose_after = lose_after  # rows beyond this are counted but never sent
+        self.requests = []
+
+    def get(self, url, headers, params, timeout):
+        self.requests.append(headers.get("range"))
+        first, last = (int(n) for n in headers["range"].split("-"))
+        last = min(last, first + self.max_rows - 1)
+        rows = self.rows
+        if "updated_at" in params:
+            op, _, since = params["updated_at"].partition(".")
+            rows = [row for row in rows if row["updated_at"] > since or (op == "gte" and row["updated_at"] == since)]
+        available = rows[:self.lose_after] if self.lose_after is not None else rows
+        page = available[first:last + 1]
+        etag = f'W/"{hash(json.dumps(page))}"'
+        if headers.get("if-none-match") == etag:
+            return Response(304, [], {})
+        content_range = f"{first}-{first + len(page) - 1}/{len(rows)}" if page else f"*/{len(rows)}"
+        return Response(206 if len(page) < len(rows) else 200, page, {"content-range": content_range, "etag": etag})
+
+
+class Response:
+    def __init__(self, status_code, body, headers):
+        self.status_code, self._body, self.headers = status_code, body, headers
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+def _rows(n):
+    return [{"kind": "barcode", "code": str(6220000000000 + i), "product": f"منتج {i}",
+             "category": None, "deleted": False, "updated_at": f"2026-10-19T00:00:{i:06d}"} for i in range(n)]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    def install(*args, **kwargs):
+        fake = PostgREST(*args, **kwargs)
+        monkeypatch.setattr(catalogueSync.requests, "get", fake.get)
+        return fake
+    return install
+
+
+@pytest.fixture
+def snapshot(monkeypatch, tmp_path):
+    path = tmp_path / "catalogue.json"
+    shutil.copy(catalogue.CATALOGUE_PATH, path)
+    monkeypatch.setattr(catalogueSync, "CATALOGUE_PATH", str(path))
+    monkeypatch.setattr(catalogueSync, "SYNC_STATE_PATH", str(tmp_path / "catalogue.json.sync"))
+    return path
+
+
+def test_pages_through_more_rows_than_the_server_sends_at_once(server):
+    fake = server(_rows(2500), max_rows=700)
+    rows, etag = catalogueSync.fetch_changed_rows()
+    assert [row["code"] for row in rows] == [row["code"] for row in _rows(2500)]
+    assert fake.requests == ["0-999", "700-1699", "1400-2399", "2100-3099"]
+    # a first page cannot vouch for rows beyond it
+    assert etag is None
+
+
+def test_single_page_answers_keep_their_etag(server):
+    server(_rows(3))
+    rows, etag = catalogueSync.fetch_changed_rows()
+    assert len(rows) == 3 and etag
+    assert catalogueSync.fetch_changed_rows(etag=etag) == (None, etag)
+
+
+def test_a_truncated_answer_is_refused(server, snapshot, capsys):
+    server(_rows(2500), lose_after=1400)
+    with pytest.raises(ValueError, match="received 1400 catalogue rows, the server counted 2500"):
+        catalogueSync.fetch_changed_rows()
+
+    before = snapshot.read_bytes()
+    assert catalogueSync.sync_catalogue(force=True) is False
+    assert snapshot.read_bytes() == before
+    assert "Catalogue sync failed" in capsys.readouterr().out
+
+
+def test_sync_applies_every_page(server, snapshot, tmp_path):
+    server(_rows(1500), max_rows=1000)
+    assert catalogueSync.sync_catalogue(force=True) is True
+    barcodes = json.loads(snapshot.read_text(encoding="utf-8"))["barcode_to_product"]
+    assert barcodes["6220000000000"] == "منتج 0" and barcodes["6220000001499"] == "منتج 1499"
+    state = json.loads((tmp_path / "catalogue.json.sync").read_text())
+    assert state["updated_at"] == _rows(1500)[-1]["updated_at"]
+
+
+def test_a_row_committed_late_with_the_last_timestamp_is_not_skipped(server, snapshot, capsys):
+    rows = _rows(3)
+    rows[2]["updated_at"] = rows[1]["updated_at"]
+    fake = server(rows[:2])
+    assert catalogueSync.sync_catalogue(force=True) is True
+
+    # committed after the first sync, with the timestamp the sync stopped at
+    fake.rows = rows
+    capsys.readouterr()
+    assert catalogueSync.sync_catalogue(force=True) is True
+    assert json.loads(snapshot.read_text(encoding="utf-8"))["barcode_to_product"]["6220000000002"] == "منتج 2"
+    # the row already applied at that timestamp is not applied again
+    assert "Catalogue sync: 1 updated rows" in capsys.readouterr().out
+
+    # nothing new: the rows at the mark come back and are all dropped
+    assert catalogueSync.sync_catalogue(force=True) is False
+    assert "Catalogue sync" not in capsys.readouterr().out
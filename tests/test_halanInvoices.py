@@ -0,0 +1,90 @@
+from functools import reduce
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from halanInvoices import build_master_and_invoices_bytes
+
+REPEATED = 6220000000001
+
+
+def _order(sheets: dict) -> bytes:
+    # the Halan order layout: barcode first, then name, qty and price before the last column
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        ws.append([" Barcode", "x", "Product name ", "qty", "price", "y"])
+        for barcode, product, qty, price in rows:
+            ws.append([barcode, "", product, qty, price, ""])
+    out = BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def merged_summary(excel_bytes: bytes) -> pd.DataFrame:
+    # the Summary rows the chained reduce/merge built before pivot_branches
+    xls = pd.ExcelFile(BytesIO(excel_bytes))
+    dfs = []
+    for name in xls.sheet_names:
+        df = pd.read_excel(xls, sheet_name=name)
+        df.columns = [c.strip() for c in df.columns]
+        small = df.iloc[:, [0, -4, -3, -2]].copy()
+        small.columns = ['Barcode', 'Product name', name, f'price_{name}']
+        small['Product name'] = small['Product name'].astype(str).str.strip()
+        dfs.append(small)
+    merged = reduce(
+        lambda a, b: pd.merge(a, b, on=['Barcode', 'Product name'], how='outer'), dfs
+    ).loc[lambda d: d['Barcode'].fillna(0) != 0]
+    qty_cols = xls.sheet_names
+    price_cols = [f'price_{s}' for s in qty_cols]
+    merged[qty_cols + price_cols] = merged[qty_cols + price_cols].apply(pd.to_numeric, errors='coerce').fillna(0)
+    merged['price'] = merged[price_cols].max(axis=1)
+    merged['total qty'] = merged[qty_cols].sum(axis=1)
+    merged['grand total'] = merged['price'] * merged['total qty']
+    merged['Barcode'] = merged['Barcode'].astype(float).map('{:.0f}'.format)
+    return merged
+
+
+def _summary(excel_bytes: bytes) -> pd.DataFrame:
+    workbook, _ = build_master_and_invoices_bytes(excel_bytes, 900, "2026-10-19", 100)
+    return pd.read_excel(BytesIO(workbook), sheet_name="Summary", dtype={"Barcode": str})
+
+
+@pytest.fixture
+def order():
+    # the repeated barcode appears twice in one branch only, where the old merge is well defined
+    return _order({
+        "مدينه نصر": [(REPEATED, "منتج 1", 2, 10), (6220000000002, "منتج 2", 4, 7.5), (REPEATED, "منتج 1", 3, 10)],
+        "اكتوبر": [(6220000000002, "منتج 2", 1, 7.5), (6220000000003, "منتج 3", 6, 2)],
+    })
+
+
+def test_a_repeated_barcode_keeps_its_price(order):
+    summary = _summary(order).set_index("Barcode")
+    row = summary.loc[str(REPEATED)]
+    assert (row["مدينه نصر"], row["total qty"], row["price"], row["grand total"]) == (5, 5, 10, 50)
+
+
+def test_summary_matches_the_chained_merge(order):
+    summary = _summary(order)
+    rows, totals = summary.iloc[:-1].set_index("Barcode"), summary.iloc[-1]
+    # the old summary listed a repeated barcode once per line; per barcode it billed the same
+    merged = merged_summary(order).groupby("Barcode").agg(
+        {"مدينه نصر": "sum", "اكتوبر": "sum", "total qty": "sum", "price": "max", "grand total": "sum"}
+    )
+    columns = ["مدينه نصر", "اكتوبر", "total qty", "price", "grand total"]
+    pd.testing.assert_frame_equal(rows.loc[merged.index, columns].astype(float), merged[columns].astype(float))
+    assert totals["Barcode"] == "المجموع"
+    assert totals["grand total"] == merged_summary(order)["grand total"].sum() == 50 + 5 * 7.5 + 12
+
+
+def test_sheets_of_one_branch_are_stacked_without_summing_prices():
+    summary = _summary(_order({
+        "حدايق الاهرام": [(REPEATED, "منتج 1", 2, 10)],
+        "حدائق الاهرام": [(REPEATED, "منتج 1", 3, 10)],
+    }))
+    row = summary.set_index("Barcode").loc[str(REPEATED)]
+    assert (row["total qty"], row["price"], row["grand total"]) == (5, 10, 50)
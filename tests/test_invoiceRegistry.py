@@ -0,0 +1,117 @@
+import io
+import sqlite3
+import zipfile
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+import invoiceRegistry
+import stateStore
+from invoiceRegistry import link_artifact, lookup, register_invoices
+
+STORE = (invoiceRegistry.STORE_TABLE, invoiceRegistry.STORE_KEY, invoiceRegistry.STORE_STAMP)
+
+
+def _bundle(members: dict) -> bytes:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return archive.getvalue()
+
+
+def test_register_and_link(tmp_path):
+    path = str(tmp_path / "invoices.sqlite")
+    assert register_invoices("talabat", "2026-10-19", [
+        (5000, "PO70001", "المعادي", "a.xlsx", b"workbook a"),
+        (5001, pd.NA, "الدقي", "b.xlsx", b"workbook b"),
+    ], path) == 2
+    upload = _bundle({"a.xlsx": b"workbook a", "branches.zip": _bundle({"b.xlsx": b"workbook b"})})
+    assert link_artifact(upload, "Talabat.zip", "order_files/20261019-Talabat.zip", path) == 2
+
+    found = lookup("5000-5001", path)
+    assert found["po"].tolist() == ["PO70001", None]
+    assert found["object_key"].tolist() == [
+        "order_files/20261019-Talabat.zip#a.xlsx",
+        "order_files/20261019-Talabat.zip#branches.zip/b.xlsx",
+    ]
+
+
+def test_errors_are_reported_not_raised(tmp_path, capsys):
+    path = str(tmp_path / "invoices.sqlite")
+    assert register_invoices("talabat", "2026-10-19", [(None, "PO1", "المعادي", "a.xlsx", b"a")], path) == 0
+    assert register_invoices("talabat", "2026-10-19", [(5000, "PO1", "المعادي", "a.xlsx", b"a")], str(tmp_path)) == 0
+    assert link_artifact(b"not a zip", "bundle.zip", "order_files/bundle.zip", path) == 0
+    out = capsys.readouterr().out
+    assert out.count("Could not register talabat invoices") == 2
+    assert "Could not link the invoices in bundle.zip" in out
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    objects = {}
+    monkeypatch.setattr(stateStore, "STATE_BUCKET", "khodar_state")
+    monkeypatch.setattr(stateStore, "download_store", lambda path: objects.get(stateStore._object_url(path)))
+    monkeypatch.setattr(stateStore, "upload_store", lambda path, data: objects.__setitem__(stateStore._object_url(path), data))
+    return objects
+
+
+def test_portal_finds_invoices_the_worker_generated(tmp_path, shared):
+    (tmp_path / "worker").mkdir()
+    (tmp_path / "portal").mkdir()
+    worker, portal = str(tmp_path / "worker" / "invoices.sqlite"), str(tmp_path / "portal" / "invoices.sqlite")
+
+    register_invoices("goodsmart", "2026-10-19", [(777, "PO9", "Zaied", "فاتورة", b"goodsmart")], portal)
+    assert stateStore.push_store(portal, *STORE)
+    register_invoices("talabat", "2026-10-19", [(5000, "PO70001", "المعادي", "a.xlsx", b"a")], worker)
+    link_artifact(b"a", "a.xlsx", "order_files/a.xlsx", worker)
+    assert stateStore.push_store(worker, *STORE)
+
+    assert stateStore.pull_store(portal, *STORE)
+    assert lookup("PO7", portal)["object_key"].tolist() == ["order_files/a.xlsx"]
+    assert lookup("777", portal)["client"].tolist() == ["goodsmart"]
+
+
+def test_lookup_on_a_corrupt_registry_raises_for_the_caller(tmp_path):
+    # the portal turns this into a warning instead of a traceback
+    path = tmp_path / "invoices.sqlite"
+    path.write_bytes(b"not a database" * 100)
+    with pytest.raises(Exception, match="not a database"):
+        lookup("5000", str(path))
+
+
+@pytest.fixture(scope="module")
+def registry(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("registry") / "invoices.sqlite")
+    for day in range(5):
+        register_invoices("talabat", pd.Timestamp("2026-01-01") + pd.Timedelta(days=day), [
+            (number, f"PO{number * 7}", f"فرع {number % 30}", f"branch_{number}.xlsx", str(number).encode())
+            for number in range(day * 1000, day * 1000 + 1000)
+        ], path)
+    # Rabbit POs are plain numbers
+    register_invoices("rabbit", "2026-01-06", [
+        (6000 + n, str(88000 + n), "المعادي", f"rabbit_{n}.xlsx", f"rabbit {n}".encode()) for n in range(20)
+    ], path)
+    return path
+
+
+def test_lookup_by_number_range_and_po_prefix(registry):
+    assert lookup("1234", registry)["po"].tolist() == ["PO8638"]
+    assert lookup(" 1200-1209 ", registry)["invoice_number"].tolist() == list(range(1200, 1210))
+    assert lookup("PO3500", registry)["invoice_number"].tolist() == [500]
+    assert lookup("PO35", registry)["invoice_number"].tolist() == [
+        n for n in range(5000) if f"PO{n * 7}".startswith("PO35")
+    ]
+    # a number no invoice has is tried as a PO prefix
+    assert lookup("88001", registry)["invoice_number"].tolist() == [6001]
+    assert lookup("8801", registry)["invoice_number"].tolist() == list(range(6010, 6020))
+    assert lookup("9000-9010", registry).empty
+
+
+def test_lookups_search_an_index(registry):
+    with closing(sqlite3.connect(registry)) as connection:
+        for where, params in (("invoice_number BETWEEN ? AND ?", [1200, 1209]),
+                              ("po >= ? AND po < ?", ["PO35", "PO35\U0010ffff"])):
+            plan = [step[-1] for step in connection.execute(f"EXPLAIN QUERY PLAN SELECT * FROM invoices WHERE {where}", params)]
+            assert any(step.startswith("SEARCH invoices USING") for step in plan), plan
@@ -0,0 +1,115 @@
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lineItemHistory import _filters, record_line_items, query_line_items, product_totals
+
+COLUMNS = {"sku": "SKU", "barcode": "Barcode", "product_name": "Item", "qty": "Qty", "unit_price": "PP"}
+
+
+def _items():
+    return pd.DataFrame({
+        "SKU": pd.array([900001, pd.NA, 900003, 900004], dtype="Int64"),
+        "Barcode": pd.array([6220000000001, pd.NA, None, 6220000000004], dtype="Int64"),
+        "Item": ["طماطم", None, np.nan, "خيار"],
+        "Qty": [3, pd.NA, np.nan, 2],
+        "PP": pd.array([5.5, None, 1.0, pd.NA], dtype="Float64"),
+    })
+
+
+def test_missing_values_are_stored_as_null(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    stored = record_line_items("talabat", "2026-10-19", [("المعادي", "PO1", 5000, _items())], COLUMNS, path)
+    assert stored == 4
+
+    lines = query_line_items("talabat", path=path)
+    assert lines["sku"].tolist() == ["900001", None, "900003", "900004"]
+    assert lines["barcode"].tolist() == ["6220000000001", None, None, "6220000000004"]
+    assert lines["product_name"].tolist() == ["طماطم", None, None, "خيار"]
+    assert lines["qty"].isna().tolist() == [False, True, True, False]
+    assert lines["unit_price"].isna().tolist() == [False, True, False, True]
+
+
+def test_object_columns_with_na_do_not_fail(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    items = _items().astype(object)
+    assert record_line_items("talabat", "2026-10-19", [("المعادي", pd.NA, pd.NA, items)], COLUMNS, path) == 4
+    assert query_line_items(path=path)["po"].isna().all()
+
+
+def test_rerunning_a_po_replaces_its_lines(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    record_line_items("talabat", "2026-10-19", [("المعادي", "PO1", 5000, _items())], COLUMNS, path)
+    record_line_items("talabat", "2026-10-19", [("المعادي", "PO1", 5000, _items().head(1))], COLUMNS, path)
+    assert len(query_line_items(path=path)) == 1
+    assert product_totals(path=path).to_dict("records") == [{"product_name": "طماطم", "qty": 3.0, "value": 16.5}]
+
+
+def test_errors_are_reported_not_raised(tmp_path, capsys):
+    # a directory cannot be opened as a database, and a missing column is a KeyError
+    assert record_line_items("talabat", "2026-10-19", [("المعادي", "PO1", 5000, _items())], COLUMNS,
+                             str(tmp_path)) == 0
+    assert record_line_items("talabat", "2026-10-19", [("المعادي", "PO1", 5000, None)], COLUMNS,
+                             str(tmp_path / "history.sqlite")) == 0
+    assert capsys.readouterr().out.count("Could not record talabat line items") == 2
+
+
+def _orders(days: int = 30, branches: int = 10, products: int = 50):
+    # synthetic Talabat runs: (delivery date, invoices) per day
+    rng = np.random.default_rng(0)
+    for day in pd.date_range("2026-01-15", periods=days):
+        invoices = []
+        for b in range(branches):
+            skus = rng.choice(products * 2, products, replace=False)
+            invoices.append((f"فرع {b}", f"PO{day:%m%d}{b}", 1000 + b, pd.DataFrame({
+                "SKU": 900000 + skus,
+                "Barcode": 6220000000000 + skus,
+                "Item": [f"منتج {s}" for s in skus],
+                "Qty": rng.integers(1, 20, products),
+                "PP": (skus % 40) * 0.5,
+            })))
+        yield day, invoices
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("history") / "line_items.sqlite")
+    frames = []
+    for day, invoices in _orders():
+        record_line_items("talabat", day, invoices, COLUMNS, path)
+        frames += [items.assign(branch=branch, delivery_date=day.date().isoformat()) for branch, _, _, items in invoices]
+    return path, pd.concat(frames, ignore_index=True)
+
+
+def test_product_query_matches_the_recorded_lines(history):
+    path, lines = history
+    month = lines.query("branch == 'فرع 3' and Item == 'منتج 17' and '2026-02-01' <= delivery_date <= '2026-02-28'")
+    assert len(month) > 0
+    for product in ("منتج 17", "6220000000017", "900017"):
+        found = query_line_items("talabat", "فرع 3", product, "2026-02-01", "2026-02-28", path)
+        assert found["delivery_date"].tolist() == month["delivery_date"].tolist()
+        assert found["qty"].tolist() == month["Qty"].astype(float).tolist()
+
+
+def test_product_totals_match_a_groupby(history):
+    path, lines = history
+    month = lines[(lines["delivery_date"] >= "2026-02-01") & (lines["delivery_date"] <= "2026-02-28")]
+    expected = month.assign(value=month["Qty"] * month["PP"]).groupby("Item")[["Qty", "value"]].sum()
+    totals = product_totals("talabat", None, "2026-02-01", "2026-02-28", path).set_index("product_name")
+    assert totals["qty"].is_monotonic_decreasing
+    pd.testing.assert_series_equal(totals["qty"].sort_index(), expected["Qty"].astype(float).sort_index(),
+                                   check_names=False)
+    pd.testing.assert_series_equal(totals["value"].sort_index(), expected["value"].sort_index(), check_names=False)
+
+
+def test_product_query_searches_an_index(history):
+    path, _ = history
+    where, params = _filters("talabat", "فرع 3", "منتج 17", "2026-02-01", "2026-02-28")
+    with closing(sqlite3.connect(path)) as connection:
+        plan = connection.execute(f"EXPLAIN QUERY PLAN SELECT * FROM line_items{where}", params).fetchall()
+    steps = [step[-1] for step in plan]
+    assert any(step.startswith("SEARCH line_items USING") for step in steps), steps
+    assert not any(step.startswith("SCAN line_items") for step in steps), steps
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from pdfReader import available_text_backends, extract_pages
+from breadfastInvoices import parse_line_items
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PDF = os.path.join(FIXTURES, "breadfast_po.pdf")
+
+
+def _expected_pages() -> list:
+    # breadfast_po.txt holds the text of each page, pages separated by form feeds
+    with open(os.path.join(FIXTURES, "breadfast_po.txt"), encoding="utf-8") as f:
+        return f.read().removesuffix("\n").split("\f")
+
+
+@pytest.mark.parametrize("backend", ["pdfplumber", "pdfium"])
+def test_backend_matches_golden_text(backend):
+    if backend not in available_text_backends():
+        pytest.skip(f"{backend} is not installed")
+    pages = extract_pages(PDF, backend=backend)
+    assert [page["text"] for page in pages] == _expected_pages()
+
+
+def test_backends_parse_the_same_line_items():
+    backends = available_text_backends()
+    if len(backends) < 2:
+        pytest.skip("only one text backend is installed")
+    parsed = []
+    for backend in backends:
+        text = "".join("\n" + page["text"] for page in extract_pages(PDF, backend=backend) if page["text"])
+        parsed.append(parse_line_items(text))
+    assert len(parsed[0]) == 8
+    for other in parsed[1:]:
+        assert other.equals(parsed[0])
+
+
+def test_tables_come_from_pdfplumber_with_either_backend():
+    for backend in available_text_backends():
+        pages = extract_pages(PDF, text=True, tables=True, backend=backend)
+        assert [page["text"] for page in pages] == _expected_pages()
+        assert all("tables" in page for page in pages)
@@ -0,0 +1,47 @@
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import config
+from pdfsToExcels import barcode_column, process_talabat_invoices
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def test_barcodes_are_int64():
+    barcodes = barcode_column(pd.Series(["6221234567890", ""], dtype=object))
+    assert str(barcodes.dtype) == "Int64"
+    assert barcodes.tolist() == [6221234567890, pd.NA]
+
+
+def test_barcodes_beyond_int64_fall_back_to_float():
+    for long_barcode in ("12345678901234567890", "123456789012345678901"):
+        barcodes = barcode_column(pd.Series(["6221234567890", long_barcode, ""], dtype=object))
+        assert str(barcodes.dtype) == "Float64"
+        assert barcodes.tolist() == [6221234567890.0, float(long_barcode), pd.NA]
+
+
+def test_po_with_a_20_digit_barcode_converts():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        with open(os.path.join(FIXTURES, "PO70000_long_barcode.pdf"), "rb") as f:
+            z.writestr("PO70000_long_barcode.pdf", f.read())
+
+    output, _ = process_talabat_invoices(
+        archive.getvalue(), "2026-10-19", 5000, config.translation_dict, config.categories_dict,
+        config.branches_dict, config.branches_translation_tlbt, config.columns
+    )
+
+    with zipfile.ZipFile(io.BytesIO(output)) as z:
+        bundle = next(name for name in z.namelist() if name.startswith("ملفات الفروع"))
+        with zipfile.ZipFile(io.BytesIO(z.read(bundle))) as branches:
+            branch_file = next(name for name in branches.namelist() if "PO70000" in name)
+            sheet = load_workbook(io.BytesIO(branches.read(branch_file)))["فاتورة"]
+    rows = list(sheet.iter_rows(min_row=11, max_col=2, values_only=True))
+    assert rows[0] == ("SKU", "Barcode")
+    # as before int64 barcodes, a barcode that long is written as a float
+    assert [barcode for _, barcode in rows[1:]] == [6221234567890, pytest.approx(12345678901234567890), 6229876543210]
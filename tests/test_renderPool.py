@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+import renderPool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(renderPool, "RENDER_WORKERS", 2)
+    monkeypatch.setattr(renderPool, "RENDER_MIN_JOBS", 2)
+    renderPool._reset_pool()
+    yield
+    renderPool._reset_pool()
+
+
+def test_default_start_method_is_not_fork():
+    assert renderPool.RENDER_START_METHOD in ("forkserver", "spawn")
+    if "KHODAR_RENDER_WORKERS" not in os.environ:
+        assert 1 <= renderPool.RENDER_WORKERS <= renderPool.RENDER_MAX_WORKERS
+
+
+def test_render_all_on_the_pool_keeps_job_order(pool):
+    jobs = [(str(n),) for n in range(40)]
+    assert renderPool.render_all(int, jobs) == list(range(40))
+    assert renderPool._pool._mp_context.get_start_method() == renderPool.RENDER_START_METHOD
+    # the jobs really ran in worker processes
+    assert os.getpid() not in renderPool.render_all(os.getpid, [()] * 10)
+
+
+def test_render_all_return_exceptions(pool):
+    results = renderPool.render_all(int, [("1",), ("x",), ("3",)], return_exceptions=True)
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], ValueError)
+    with pytest.raises(ValueError):
+        renderPool.render_all(int, [("1",), ("x",), ("3",)])
@@ -0,0 +1,82 @@
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from sheetReader import CalamineWorkbook, excel_reader, grid_frame, read_sheet, read_sheets
+
+READERS = ["openpyxl", pytest.param("calamine", marks=pytest.mark.skipif(
+    CalamineWorkbook is None, reason="python-calamine is not installed"))]
+
+
+def _workbook(*sheets) -> bytes:
+    wb = Workbook()
+    wb.remove(wb.active)
+    for number, rows in enumerate(sheets):
+        ws = wb.create_sheet(f"Sheet{number + 1}")
+        for row in rows:
+            ws.append(row)
+    out = BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+# a Rabbit-like order: a header block above the item table, blanks, floats, dates
+ORDER = [
+    ["Purchase Order", None, None, None],
+    ["PO", "PO-1001", None, None],
+    ["Date", datetime(2026, 10, 19), None, None],
+    [None, None, None, None],
+    ["SKU", "Barcode", "Unit Cost", "Total PC"],
+    [101, 6220000000001, 12.5, 4],
+    [102, 6220000000002, 3, None],
+    [103, None, 7.25, 2.0],
+    [None, None, "Total", 6],
+]
+# whitespace-only cells, including the only value of the last row and of the last column
+WHITESPACE = [
+    ["a", "b", "c"],
+    [1, " ", 3],
+    [4, 5, 6, "  "],
+    ["   "],
+]
+
+
+def _assert_reads_like_read_excel(data, reader, **kwargs):
+    expected = pd.read_excel(BytesIO(data), **kwargs)
+    actual = grid_frame(read_sheet(data, reader), **kwargs)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("reader", READERS)
+@pytest.mark.parametrize("skiprows", [None, 4])
+def test_grid_frame_matches_read_excel(reader, skiprows):
+    _assert_reads_like_read_excel(_workbook(ORDER), reader, skiprows=skiprows)
+
+
+def test_whitespace_only_cells_match_read_excel():
+    data = _workbook(WHITESPACE)
+    _assert_reads_like_read_excel(data, "openpyxl")
+    frame = grid_frame(read_sheet(data, "openpyxl"))
+    assert frame.shape == (3, 4)
+    assert frame.iloc[-1, 0] == "   " and frame.iloc[1, -1] == "  "
+
+
+@pytest.mark.skipif(CalamineWorkbook is None, reason="python-calamine is not installed")
+@pytest.mark.xfail(strict=True, reason="calamine reads whitespace-only cells as blank, so it is not the default")
+def test_calamine_whitespace_only_cells():
+    _assert_reads_like_read_excel(_workbook(WHITESPACE), "calamine")
+
+
+def test_every_sheet_in_workbook_order():
+    sheets = read_sheets(_workbook(ORDER, WHITESPACE))
+    assert list(sheets) == ["Sheet1", "Sheet2"]
+    assert sheets["Sheet2"][0] == ["a", "b", "c", ""]
+
+
+def test_openpyxl_is_the_default():
+    assert excel_reader() == "openpyxl"
+    with pytest.raises(ValueError):
+        excel_reader("xlrd")
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+import lineItemHistory
+import stateStore
+from lineItemHistory import record_line_items, query_line_items
+
+COLUMNS = {"product_name": "Item", "qty": "Qty"}
+STORE = (lineItemHistory.STORE_TABLE, lineItemHistory.STORE_KEY, lineItemHistory.STORE_STAMP)
+
+
+def _record(path, po, items, qty=1):
+    frame = pd.DataFrame({"Item": items, "Qty": [qty] * len(items)})
+    record_line_items("talabat", "2026-10-19", [("المعادي", po, 5000, frame)], COLUMNS, path)
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    # the storage bucket, as {object name: bytes}
+    objects = {}
+    monkeypatch.setattr(stateStore, "STATE_BUCKET", "khodar_state")
+    monkeypatch.setattr(stateStore, "download_store", lambda path: objects.get(stateStore._object_url(path)))
+    monkeypatch.setattr(stateStore, "upload_store", lambda path, data: objects.__setitem__(stateStore._object_url(path), data))
+    return objects
+
+
+def _lines(path):
+    return sorted(zip(*[query_line_items(path=path)[c] for c in ("po", "product_name", "qty")]))
+
+
+def test_newer_copy_of_a_po_wins(tmp_path):
+    old, new = str(tmp_path / "old.sqlite"), str(tmp_path / "new.sqlite")
+    _record(old, "PO1", ["طماطم", "خيار"])
+    _record(old, "PO2", ["بطاطس"])
+    _record(new, "PO1", ["طماطم"], qty=3)
+
+    assert stateStore.merge_store(new, old, *STORE) == 1
+    assert _lines(old) == [("PO1", "طماطم", 3.0), ("PO2", "بطاطس", 1.0)]
+    # merging the older copy back changes nothing
+    assert stateStore.merge_store(old, new, *STORE) == 1
+    assert _lines(new) == _lines(old)
+
+
+def test_worker_and_portal_runs_keep_each_others_lines(tmp_path, shared):
+    worker, portal = str(tmp_path / "worker" / "line_items.sqlite"), str(tmp_path / "portal" / "line_items.sqlite")
+    (tmp_path / "worker").mkdir()
+    (tmp_path / "portal").mkdir()
+
+    _record(worker, "PO1", ["طماطم"])
+    assert stateStore.push_store(worker, *STORE)
+    # both pull, then each records its own PO and pushes
+    assert stateStore.pull_store(portal, *STORE)
+    _record(portal, "PO2", ["خيار"])
+    _record(worker, "PO3", ["بطاطس"])
+    assert stateStore.push_store(portal, *STORE)
+    assert stateStore.push_store(worker, *STORE)
+
+    # a fresh checkout pulls everything
+    (tmp_path / "fresh").mkdir()
+    fresh = str(tmp_path / "fresh" / "line_items.sqlite")
+    assert stateStore.pull_store(fresh, *STORE)
+    assert [po for po, _, _ in _lines(fresh)] == ["PO1", "PO2", "PO3"]
+
+
+def test_storage_errors_are_reported_not_raised(tmp_path, monkeypatch, capsys):
+    def unreachable(path):
+        raise ConnectionError("storage unreachable")
+    monkeypatch.setattr(stateStore, "STATE_BUCKET", "khodar_state")
+    monkeypatch.setattr(stateStore, "download_store", unreachable)
+    path = str(tmp_path / "line_items.sqlite")
+    _record(path, "PO1", ["طماطم"])
+    assert not stateStore.pull_store(path, *STORE)
+    assert not stateStore.push_store(path, *STORE)
+    assert "storage unreachable" in capsys.readouterr().out
+    assert len(query_line_items(path=path)) == 1
+
+
+def test_nothing_leaves_the_machine_without_a_state_bucket(tmp_path, monkeypatch, capsys):
+    def refuse(*args):
+        raise AssertionError("storage was called")
+    monkeypatch.setattr(stateStore, "STATE_BUCKET", "")
+    monkeypatch.setattr(stateStore, "download_store", refuse)
+    monkeypatch.setattr(stateStore, "upload_store", refuse)
+    monkeypatch.setattr(stateStore, "_told_local", False)
+    path = str(tmp_path / "line_items.sqlite")
+    _record(path, "PO1", ["طماطم"])
+    assert not stateStore.push_store(path, *STORE)
+    assert not stateStore.pull_store(path, *STORE)
+    stateStore.pull_stores()
+    stateStore.pull_stores()
+    stateStore.push_stores()
+    assert capsys.readouterr().out.count("KHODAR_STATE_BUCKET is not set") == 1
+    assert len(query_line_items(path=path)) == 1
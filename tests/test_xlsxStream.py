@@ -0,0 +1,53 @@
+import io
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from xlsxStream import write_frame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# peak RSS growth allowed for streaming 100k rows × 12 columns; streaming stays near 5 MiB,
+# while xlsxwriter's default in-memory mode needs about 150 MiB for the same rows
+MEMORY_CEILING_MIB = 32
+
+# run in a fresh interpreter so its peak RSS counts only the imports and this write;
+# the rows come from a generator so no frame of them is held either
+_WRITE_100K_ROWS = """
+import resource, sys
+from xlsxStream import write_rows
+
+def rows():
+    for i in range(100_000):
+        yield [6220000000000 + i, f"منتج {i % 5000}"] + [float(i % 7)] * 10
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+data = write_rows(rows(), header=["Barcode", "Product name"] + [f"فرع {c}" for c in range(10)])
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+# ru_maxrss is in KiB on Linux and in bytes on macOS
+print(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), len(data))
+"""
+
+
+def test_writing_100k_rows_stays_under_the_memory_ceiling():
+    result = subprocess.run(
+        [sys.executable, "-c", _WRITE_100K_ROWS], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    peak_mib, size = result.stdout.split()
+    assert float(peak_mib) < MEMORY_CEILING_MIB, f"streaming 100k rows grew RSS by {peak_mib} MiB"
+    assert int(size) > 0
+
+
+def test_frame_cells_match_to_excel():
+    df = pd.DataFrame({
+        "Barcode": [6220000000001, 6220000000002],
+        "Product name": ["طماطم", None],
+        "qty": [1.5, float("nan")],
+    })
+    expected = io.BytesIO()
+    df.to_excel(expected, index=False)
+
+    streamed = pd.read_excel(io.BytesIO(write_frame(df)))
+    pd.testing.assert_frame_equal(streamed, pd.read_excel(expected))
@@ -0,0 +1,85 @@
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+# Streaming writer for the consolidated workbooks (region totals, طلبيات, Rabbit's مجمع
+# files). xlsxwriter's constant_memory mode flushes each row to a temporary file as soon
+# as the next one starts, so memory stays flat however many branches and SKUs a day has.
+# Rows must therefore be written top to bottom, and formats are registered before the
+# first row.
+
+# pandas' to_excel header style
+HEADER = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def _new_workbook(buffer):
+    return xlsxwriter.Workbook(buffer, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+
+
+def write_rows(rows, sheet_name: str = "Sheet1", header: list = None) -> bytes:
+    """
+    A one-sheet workbook from an iterable of row lists, written as they are consumed;
+    None leaves a cell empty. `header` is an optional first row in the pandas header style.
+    """
+    buffer = BytesIO()
+    workbook = _new_workbook(buffer)
+    worksheet = workbook.add_worksheet(sheet_name)
+    r_idx = 0
+    if header is not None:
+        worksheet.write_row(0, 0, header, workbook.add_format(HEADER))
+        r_idx = 1
+    for row in rows:
+        worksheet.write_row(r_idx, 0, row)
+        r_idx += 1
+    workbook.close()
+    return buffer.getvalue()
+
+
+def frame_rows(df: pd.DataFrame):
+    """The rows of `df` as lists of plain Python values, with None for missing ones."""
+    columns = []
+    for col in df.columns:
+        values = df[col].to_numpy(dtype=object)
+        values[pd.isna(values)] = None
+        columns.append(values)
+    for row in zip(*columns):
+        yield list(row)
+
+
+def write_frame(df: pd.DataFrame, sheet_name: str = "Sheet1") -> bytes:
+    """Same cells as df.to_excel(index=False), streamed row by row."""
+    return write_rows(frame_rows(df), sheet_name, header=list(df.columns))
+
+
+def benchmark_stream(rows: int = 100_000, columns: int = 12) -> tuple:
+    """(seconds, peak traced MiB) for streaming a `rows` × `columns` frame."""
+    df = pd.DataFrame({
+        "Barcode": range(6220000000000, 6220000000000 + rows),
+        "Product name": [f"منتج {i % 5000}" for i in range(rows)],
+        **{f"فرع {c}": [float(i % 7) for i in range(rows)] for c in range(columns - 2)},
+    })
+    start = time.perf_counter()
+    write_frame(df)
+    seconds = time.perf_counter() - start
+    # traced separately: tracemalloc slows the write several times over
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    write_frame(df)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
+
+
+if __name__ == "__main__":
+    # Usage: python xlsxStream.py [rows] [columns]
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    seconds, peak = benchmark_stream(rows, columns)
+    print(f"{rows} rows × {columns} columns: {seconds:.2f} s, peak {peak:.1f} MiB above the frame")
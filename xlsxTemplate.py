@@ -0,0 +1,176 @@
+import re
+import zipfile
+from datetime import datetime, timezone
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import xlsxwriter
+from xlsxwriter.utility import xl_col_to_name
+
+# Template stamping for workbooks that are produced many times a day with the same
+# layout (branch invoices). A master workbook is built once with xlsxwriter: it fixes the
+# sheet list, styles, theme, column defaults and embedded logo. Every invoice after that
+# reuses those parts byte for byte and only its worksheet <sheetData> (plus dimension,
+# column widths and merged ranges) is generated, with inline strings so the shared
+# strings table never needs rebuilding.
+
+_templates = {}
+
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_COLUMN_NAMES = [xl_col_to_name(col) for col in range(64)]
+
+
+def _column_name(col: int) -> str:
+    return _COLUMN_NAMES[col] if col < len(_COLUMN_NAMES) else xl_col_to_name(col)
+
+
+def _column_width(width: float) -> float:
+    # the character width Excel stores for a width given in xlsxwriter units (Calibri 11)
+    if width < 1:
+        return int(int(width * 12 + 0.5) / 7.0 * 256.0) / 256.0
+    return int((int(width * 7 + 0.5) + 5) / 7.0 * 256.0) / 256.0
+
+
+def build_template(build_master) -> dict:
+    """
+    Builds a template from `build_master(workbook)`, which adds the sheets with their
+    static content (images, default widths) and returns {style_name: Format} for every
+    style the stamped cells will use.
+    """
+    buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"in_memory": True})
+    styles = build_master(workbook)
+    worksheets = workbook.worksheets()
+    # a style only gets an index once a cell uses it; these cells are replaced when stamping
+    for offset, fmt in enumerate(styles.values()):
+        worksheets[0].write_blank(1048575 - offset, 0, None, fmt)
+    workbook.close()
+
+    archive = zipfile.ZipFile(BytesIO(buffer.getvalue()))
+    parts = [(info.filename, archive.read(info.filename)) for info in archive.infolist()]
+    sheets = {}
+    for index, worksheet in enumerate(worksheets, start=1):
+        path = f"xl/worksheets/sheet{index}.xml"
+        xml = archive.read(path).decode("utf-8")
+        head, rest = xml.split("<sheetData", 1)
+        tail = rest.split("</sheetData>", 1)[1] if "</sheetData>" in rest else rest.split("/>", 1)[1]
+        sheets[worksheet.get_name()] = {
+            "path": path,
+            "head": re.sub(r"<cols>.*?</cols>", "", head),
+            "cols": re.search(r"<cols>.*?</cols>", head).group(0) if "<cols>" in head else "",
+            "tail": re.sub(r"<mergeCells.*?</mergeCells>", "", tail),
+        }
+    return {
+        "parts": parts,
+        "sheets": sheets,
+        "styles": {name: fmt.xf_index for name, fmt in styles.items()},
+    }
+
+
+def get_template(name: str, build_master) -> dict:
+    """The template `name`, built with `build_master` on first use in this process."""
+    template = _templates.get(name)
+    if template is None:
+        template = _templates[name] = build_template(build_master)
+    return template
+
+
+def _cell_xml(ref: str, value, style) -> str:
+    s = f' s="{style}"' if style else ""
+    if value is None or (isinstance(value, float) and value != value):
+        return f'<c r="{ref}"{s}/>' if style else ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{s} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, str):
+        if value.startswith("="):
+            return f'<c r="{ref}"{s}><f>{escape(value[1:])}</f><v>0</v></c>'
+        if value == "":
+            return f'<c r="{ref}"{s}/>' if style else ""
+        text = escape(_CONTROL_CHARS.sub("", value))
+        space = ' xml:space="preserve"' if value != value.strip() else ""
+        return f'<c r="{ref}"{s} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+    return f'<c r="{ref}"{s}><v>{value:.16G}</v></c>'
+
+
+def sheet_xml(template: dict, sheet_name: str, cells, merges=(), widths=None, heights=None) -> bytes:
+    """
+    Worksheet XML for one stamped sheet.
+    Args:
+        cells: iterable of (row, col, value, style_name), 0-based; later cells win
+        merges: (first_row, first_col, last_row, last_col) ranges
+        widths: {col: width} replacing the master's column widths
+        heights: {row: height}
+    """
+    sheet = template["sheets"][sheet_name]
+    style_ids = template["styles"]
+    heights = heights or {}
+
+    grid = {}
+    for row, col, value, style in cells:
+        grid[(row, col)] = (value, style_ids[style] if style is not None else 0)
+
+    rows = {}
+    for (row, col) in sorted(grid):
+        rows.setdefault(row, []).append(col)
+    for row in heights:
+        rows.setdefault(row, [])
+
+    parts = []
+    for row in sorted(rows):
+        height = heights.get(row)
+        attributes = f' ht="{height:g}" customHeight="1"' if height is not None else ""
+        parts.append(f'<row r="{row + 1}"{attributes}>')
+        for col in rows[row]:
+            value, style = grid[(row, col)]
+            parts.append(_cell_xml(f"{_column_name(col)}{row + 1}", value, style))
+        parts.append("</row>")
+
+    if grid:
+        last_row = max(row for row, _ in grid)
+        last_col = max(col for _, col in grid)
+        dimension = f"A1:{_column_name(last_col)}{last_row + 1}"
+    else:
+        dimension = "A1"
+    head = re.sub(r'<dimension ref="[^"]*"/>', f'<dimension ref="{dimension}"/>', sheet["head"], count=1)
+
+    if widths is not None:
+        cols = "".join(
+            f'<col min="{col + 1}" max="{col + 1}" width="{_column_width(width):.16g}" customWidth="1"/>'
+            for col, width in sorted(widths.items())
+        )
+        cols = f"<cols>{cols}</cols>" if cols else ""
+    else:
+        cols = sheet["cols"]
+
+    merge_xml = ""
+    if merges:
+        ranges = "".join(
+            f'<mergeCell ref="{_column_name(c1)}{r1 + 1}:{_column_name(c2)}{r2 + 1}"/>'
+            for r1, c1, r2, c2 in merges
+        )
+        merge_xml = f'<mergeCells count="{len(merges)}">{ranges}</mergeCells>'
+
+    data = "<sheetData>" + "".join(parts) + "</sheetData>" if parts else "<sheetData/>"
+    return (head + cols + data + merge_xml + sheet["tail"]).encode("utf-8")
+
+
+def render(template: dict, sheets: dict) -> bytes:
+    """
+    One workbook from the template. `sheets` maps sheet name → keyword arguments of
+    sheet_xml; sheets left out are written empty.
+    """
+    stamped = {
+        sheet["path"]: sheet_xml(template, name, **sheets.get(name, {"cells": ()}))
+        for name, sheet in template["sheets"].items()
+    }
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path, data in template["parts"]:
+            if path in stamped:
+                data = stamped[path]
+            elif path == "docProps/core.xml":
+                data = re.sub(rb"(<dcterms:(?:created|modified)[^>]*>)[^<]*", rb"\g<1>" + now.encode(), data)
+            archive.writestr(path, data)
+    return buffer.getvalue()
@@ -0,0 +1,55 @@
+import time
+import shutil
+import zipfile
+from io import BytesIO
+from contextlib import contextmanager
+
+# Output bundles are assembled member by member straight into the final archive. Workbooks
+# and nested archives are already deflated, so they are stored as they are instead of being
+# compressed a second time, and a nested archive is written through its parent's member
+# stream rather than into a buffer of its own that is then copied in.
+STORED_SUFFIXES = (".xlsx", ".zip", ".png")
+COPY_CHUNK = 1024 * 1024
+
+
+def member_info(name: str) -> zipfile.ZipInfo:
+    """ZipInfo for a new member: stored for already-compressed files, deflated otherwise."""
+    info = zipfile.ZipInfo(name, time.localtime(time.time())[:6])
+    stored = name.lower().endswith(STORED_SUFFIXES)
+    info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+    info.external_attr = 0o600 << 16  # what writestr gives a member added by name
+    return info
+
+
+def add_member(archive: zipfile.ZipFile, name: str, data) -> None:
+    """Adds `data` (bytes, or a buffer's getbuffer() view to skip the copy) as `name`."""
+    archive.writestr(member_info(name), data)
+
+
+@contextmanager
+def open_member(archive: zipfile.ZipFile, name: str):
+    """A writable stream for member `name`; only one member can be open at a time."""
+    with archive.open(member_info(name), "w") as member:
+        yield member
+
+
+@contextmanager
+def nested_archive(archive: zipfile.ZipFile, name: str):
+    """A ZipFile whose bytes go straight into member `name` of `archive`."""
+    with open_member(archive, name) as member, zipfile.ZipFile(member, "w") as inner:
+        yield inner
+
+
+def copy_members(source: zipfile.ZipFile, names: list, archive: zipfile.ZipFile) -> None:
+    """Copies members of `source` into `archive` a chunk at a time."""
+    for name in names:
+        with source.open(name) as src, open_member(archive, name) as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+
+
+def repack(source: zipfile.ZipFile, names: list) -> bytes:
+    """A new archive holding `names` from `source`, e.g. to split a bundle for upload."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        copy_members(source, names, archive)
+    return buffer.getvalue()